@@ -1,22 +1,113 @@
 import os
+import re
+import atexit
 import json
+import math
+import heapq
+import bisect
+import random
+import itertools
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 import base64
 import hmac
 import hashlib
+import uuid
+import decimal
 import requests
-from typing import Optional, Dict, Any
-from datetime import datetime
-from bson import ObjectId
+from typing import Optional, Dict, Any, List, Tuple, Callable
+from datetime import datetime, date, timedelta, timezone
+from bson import ObjectId, Decimal128, Binary, Timestamp, json_util
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request, redirect
+import click
+from flask import Flask, Response, g, jsonify, request, redirect
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.collation import Collation, CollationStrength
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
 import bcrypt
+import numpy as np
 from cryptography.fernet import Fernet, InvalidToken
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
 load_dotenv()
 
+
+def format_datetime(value: datetime) -> str:
+    # Mongo hands back naive UTC datetimes; always emit an explicit Z.
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat() + "Z"
+
+
+def json_default(value):
+    """Encode the BSON/stdlib types found in our documents."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return format_datetime(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (Binary, bytes)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    if isinstance(value, Timestamp):
+        return {"t": value.time, "i": value.inc}
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class MongoJSONProvider(JSONProvider):
+    """JSON provider that encodes Mongo documents as-is.
+
+    Uses orjson when it is installed and the stdlib json module otherwise;
+    both produce the same output for our documents.
+    """
+
+    if orjson is not None:
+        _options = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+        def dumps_bytes(self, obj: Any) -> bytes:
+            return orjson.dumps(obj, default=json_default, option=self._options)
+
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            return self.dumps_bytes(obj).decode("utf-8")
+
+        def loads(self, s, **kwargs: Any) -> Any:
+            return orjson.loads(s)
+    else:
+        def dumps_bytes(self, obj: Any) -> bytes:
+            return self.dumps(obj).encode("utf-8")
+
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            kwargs.setdefault("default", json_default)
+            kwargs.setdefault("ensure_ascii", False)
+            kwargs.setdefault("separators", (",", ":"))
+            return json.dumps(obj, **kwargs)
+
+        def loads(self, s, **kwargs: Any) -> Any:
+            return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype="application/json")
+
+
 app = Flask(__name__)
+app.json = MongoJSONProvider(app)
 CORS(app)
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
@@ -68,12 +159,36 @@ def mask_iin(iin: Optional[str]) -> Optional[str]:
 
 
 def serialize(doc):
+    # ObjectId and datetime values are encoded by MongoJSONProvider.
     if not doc:
         return None
-    doc["_id"] = str(doc["_id"])
     return doc
 
 
+# Change markers. Every write stamps CHANGE_FIELD with a server-assigned BSON
+# timestamp (unique and increasing per mongod): an empty Timestamp(0, 0) in a
+# top-level field is filled in on insert, and $currentDate does it on update.
+CHANGE_FIELD = "_changed"
+
+
+def stamp_insert(doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc[CHANGE_FIELD] = Timestamp(0, 0)
+    return doc
+
+
+def stamp_update(update: Dict[str, Any]) -> Dict[str, Any]:
+    update.setdefault("$currentDate", {})[CHANGE_FIELD] = {"$type": "timestamp"}
+    return update
+
+
+def record_deletion(collection: str, doc_id: Any):
+    db.tombstones.insert_one(stamp_insert({
+        "collection": collection,
+        "doc_id": str(doc_id),
+        "deleted_at": datetime.utcnow(),
+    }))
+
+
 def parse_object_id(value):
     if not value:
         return None
@@ -83,6 +198,318 @@ def parse_object_id(value):
         return None
 
 
+DEFAULT_PAGE_LIMIT = int(os.getenv("DEFAULT_PAGE_LIMIT", "50"))
+MAX_PAGE_LIMIT = int(os.getenv("MAX_PAGE_LIMIT", "200"))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def encode_cursor(doc: Dict[str, Any], sort_field: str) -> str:
+    payload = {"v": doc.get(sort_field), "id": doc["_id"]}
+    raw = json_util.dumps(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        object_id = payload["id"]
+        if not isinstance(object_id, ObjectId):
+            raise ValueError("cursor id is not an ObjectId")
+        return payload.get("v"), object_id
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def parse_page_args() -> Optional[Tuple[int, Optional[str]]]:
+    """Return (limit, cursor) when the client asked for a page, else None."""
+    raw_limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    if raw_limit is None and cursor is None:
+        return None
+    if raw_limit is None:
+        limit = DEFAULT_PAGE_LIMIT
+    else:
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            raise ValueError("limit must be a number")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_LIMIT), cursor or None
+
+
+def keyset_query(query: Dict[str, Any], sort_field: str, direction: int,
+                 cursor: Optional[str]) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+    """Build the (filter, sort) pair that resumes after `cursor`."""
+    op = "$lt" if direction == DESCENDING else "$gt"
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        same_key = {sort_field: value, "_id": {op: last_id}}
+        if sort_field == "_id":
+            after = {"_id": {op: last_id}}
+        elif value is None:
+            # Missing/null keys sort before every value: ascending continues
+            # into the non-null keys, descending has nothing left after them.
+            if direction == DESCENDING:
+                after = same_key
+            else:
+                after = {"$or": [{sort_field: {"$ne": None}}, same_key]}
+        else:
+            after = {"$or": [{sort_field: {op: value}}, same_key]}
+            if direction == DESCENDING:
+                after["$or"].append({sort_field: None})
+        query = {"$and": [query, after]} if query else after
+    sort = [("_id", direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+    return query, sort
+
+
+def keyset_page(collection, query: Dict[str, Any], sort_field: str, direction: int,
+                limit: int, cursor: Optional[str],
+                projection: Optional[Dict[str, int]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page ordered by (sort_field, _id) starting after `cursor`."""
+    query, sort = keyset_query(query, sort_field, direction, cursor)
+    # Fetch one extra document to learn whether another page exists.
+    docs = list(collection.find(query, projection).sort(sort).limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+    return docs, next_cursor
+
+
+# Sparse fieldsets: `?fields=a,b` selects from the route's whitelist, `*` selects
+# the whole whitelist. List routes default to the compact card shape.
+FREELANCER_CARD_FIELDS = (
+    "user_id", "title", "bio", "skills", "hourly_rate", "location",
+    "level", "professionalism", "rating", "rating_count", "completed_projects",
+)
+FREELANCER_FIELDS = FREELANCER_CARD_FIELDS + (
+    "rating_histogram", "categories",
+    "phone", "languages", "education", "experience", "certifications",
+    "created_at", "updated_at",
+)
+JOB_CARD_FIELDS = (
+    "title", "description", "category", "budget", "timeframe", "level", "skills",
+    "created_at", "client", "client_name", "rating", "proposals", "views",
+)
+JOB_FIELDS = JOB_CARD_FIELDS + ("client_id", "updated_at")
+# Never returned by user reads.
+USER_PROJECTION = {"password": 0, "xp_batches": 0}
+
+
+def parse_fields(allowed: Tuple[str, ...], default: Optional[Tuple[str, ...]] = None) -> Optional[Dict[str, int]]:
+    """Turn `?fields=` into a MongoDB projection; None means the whole document."""
+    raw = request.args.get("fields")
+    if not raw:
+        names = default
+    elif raw.strip() == "*":
+        names = allowed
+    else:
+        names = [name.strip() for name in raw.split(",") if name.strip()]
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    if names is None:
+        return None
+    return {name: 1 for name in names}
+
+
+FACET_LIMIT = 50
+
+
+def faceted_list_response(collection, query: Dict[str, Any], facet_fields: Tuple[str, ...],
+                          sort_field: str = "_id", direction: int = ASCENDING,
+                          projection: Optional[Dict[str, int]] = None):
+    """One page of `query` plus per-value counts for `facet_fields`.
+
+    Everything is computed by a single $facet aggregation; the counts cover
+    the whole filtered set, not just the page.
+    """
+    try:
+        limit, cursor = parse_page_args() or (DEFAULT_PAGE_LIMIT, None)
+        page_query, sort = keyset_query({}, sort_field, direction, cursor)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    items_pipeline = [{"$sort": dict(sort)}]
+    if page_query:
+        items_pipeline.insert(0, {"$match": page_query})
+    items_pipeline.append({"$limit": limit + 1})
+    if projection is not None:
+        items_pipeline.append({"$project": {**projection, sort_field: 1}})
+    facets = {"items": items_pipeline}
+    for field in facet_fields:
+        facets[field] = [
+            {"$unwind": f"${field}"},
+            {"$match": {field: {"$nin": [None, ""]}}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": FACET_LIMIT},
+        ]
+    result = next(collection.aggregate([{"$match": query}, {"$facet": facets}]))
+    docs = result["items"]
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+    return jsonify({
+        "items": [serialize(doc) for doc in docs],
+        "next_cursor": next_cursor,
+        "facets": {
+            field: [{"value": bucket["_id"], "count": bucket["count"]} for bucket in result[field]]
+            for field in facet_fields
+        },
+    })
+
+
+def wants_ndjson() -> bool:
+    if request.args.get("stream", "").lower() in {"1", "true", "yes"}:
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def ndjson_response(cursor, sort_field: str = "_id", limit: int = 0) -> Response:
+    """Stream a PyMongo cursor as one JSON document per line.
+
+    The last line is always {"next_cursor": ...}. It is null once the result
+    is exhausted. When `limit` is set, `cursor` must yield up to limit + 1
+    documents; the extra one only tells us that there is another page.
+    """
+    def generate():
+        last = None
+        sent = 0
+        more = False
+        try:
+            for doc in cursor:
+                if limit and sent == limit:
+                    more = True
+                    break
+                last = doc
+                sent += 1
+                yield app.json.dumps(serialize(doc)) + "\n"
+        finally:
+            cursor.close()
+        next_cursor = encode_cursor(last, sort_field) if more else None
+        yield app.json.dumps({"next_cursor": next_cursor}) + "\n"
+    return Response(generate(), mimetype=NDJSON_MIMETYPE)
+
+
+def list_response(collection, query: Dict[str, Any], sort_field: str = "_id", direction: int = ASCENDING,
+                  projection: Optional[Dict[str, int]] = None):
+    """Shared body of the list routes.
+
+    Without `limit`/`cursor` the whole result is returned as a plain array, as
+    before. With either parameter the response becomes
+    {"items": [...], "next_cursor": "..."}; next_cursor is null on the last page.
+    With `?stream=1` or `Accept: application/x-ndjson` the documents are
+    streamed as NDJSON instead, honouring `cursor`/`limit` when given; the
+    trailing {"next_cursor": ...} line resumes the export.
+    """
+    try:
+        page = parse_page_args()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if projection is not None and sort_field != "_id":
+        # The sort key is needed to build next_cursor.
+        projection = {**projection, sort_field: 1}
+    if wants_ndjson():
+        limit, cursor = page if page else (0, None)
+        try:
+            query, sort = keyset_query(query, sort_field, direction, cursor)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return ndjson_response(
+            collection.find(query, projection).sort(sort).limit(limit + 1 if limit else 0)
+            .batch_size(STREAM_BATCH_SIZE),
+            sort_field,
+            limit,
+        )
+    if page is None:
+        query, sort = keyset_query(query, sort_field, direction, None)
+        return jsonify([serialize(doc) for doc in collection.find(query, projection).sort(sort)])
+    limit, cursor = page
+    try:
+        docs, next_cursor = keyset_page(collection, query, sort_field, direction, limit, cursor, projection)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"items": [serialize(doc) for doc in docs], "next_cursor": next_cursor})
+
+
+# Conditional GET. ETags are derived from change markers (or timestamps for
+# documents that predate them), never from the serialized body.
+PUBLIC_CACHE_CONTROL = os.getenv(
+    "PUBLIC_CACHE_CONTROL", "public, max-age=0, s-maxage=30, stale-while-revalidate=60"
+)
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+VERSION_PROJECTION = {CHANGE_FIELD: 1, "updated_at": 1, "created_at": 1}
+
+
+def doc_version(doc: Optional[Dict[str, Any]]) -> str:
+    if not doc:
+        return "-"
+    marker = doc.get(CHANGE_FIELD)
+    if isinstance(marker, Timestamp) and marker.time:
+        return f"{marker.time}.{marker.inc}"
+    stamp = doc.get("updated_at") or doc.get("created_at")
+    return f"{doc.get('_id')}@{stamp.isoformat() if isinstance(stamp, datetime) else ''}"
+
+
+def collection_version(collection) -> str:
+    """Latest change marker plus document count, both index/metadata reads."""
+    latest = collection.find_one({}, {CHANGE_FIELD: 1}, sort=[(CHANGE_FIELD, DESCENDING)])
+    return f"{doc_version(latest)}#{collection.estimated_document_count()}"
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag for this path + query string + the given version parts."""
+    key = "|".join([request.path, request.query_string.decode("latin-1"), *map(str, parts)])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def client_has(etag: str) -> bool:
+    return request.if_none_match.contains(etag)
+
+
+def with_validators(response, etag: str, cache_control: str = PUBLIC_CACHE_CONTROL) -> Response:
+    response = app.make_response(response)
+    if response.status_code == 200:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = cache_control
+        response.vary.add("Accept")
+    return response
+
+
+def not_modified(etag: str, cache_control: str = PUBLIC_CACHE_CONTROL) -> Response:
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept")
+    return response
+
+
+def conditional_document(collection, object_id: ObjectId, projection: Optional[Dict[str, int]] = None):
+    """GET one document with ETag/If-None-Match handling.
+
+    When the client sends If-None-Match only the version fields are read
+    first, so a 304 never loads or encodes the full document.
+    """
+    if request.if_none_match:
+        head = collection.find_one({"_id": object_id}, VERSION_PROJECTION)
+        if not head:
+            return jsonify({"error": "not found"}), 404
+        etag = make_etag(doc_version(head))
+        if client_has(etag):
+            return not_modified(etag)
+    doc = collection.find_one({"_id": object_id}, projection if projection is None else {**projection, **VERSION_PROJECTION})
+    if not doc:
+        return jsonify({"error": "not found"}), 404
+    etag = make_etag(doc_version(doc))
+    if projection is not None:
+        doc = {k: v for k, v in doc.items() if k in projection or k == "_id"}
+    return with_validators(jsonify(serialize(doc)), etag)
+
+
 def attach_masked_iin(user: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     if not user:
         return None
@@ -126,6 +553,99 @@ def compute_level(xp: int) -> Dict[str, Any]:
     return {"level": current_level, "professionalism": progress}
 
 
+def level_expressions(xp: Any) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Aggregation equivalents of compute_level() for pipeline updates."""
+    xp = {"$max": [0, xp]}
+    level_branches = []
+    progress_branches = []
+    for idx in range(len(LEVEL_THRESHOLDS) - 1, -1, -1):
+        name, threshold = LEVEL_THRESHOLDS[idx]
+        case = {"$gte": [xp, threshold]}
+        if idx + 1 < len(LEVEL_THRESHOLDS):
+            span = LEVEL_THRESHOLDS[idx + 1][1] - threshold
+            progress = {"$trunc": {"$multiply": [{"$divide": [{"$subtract": [xp, threshold]}, span]}, 100]}}
+            progress = {"$toInt": {"$max": [0, {"$min": [100, progress]}]}}
+        else:
+            progress = 100
+        level_branches.append({"case": case, "then": name})
+        progress_branches.append({"case": case, "then": progress})
+    return (
+        {"$switch": {"branches": level_branches, "default": LEVEL_THRESHOLDS[0][0]}},
+        {"$switch": {"branches": progress_branches, "default": 0}},
+    )
+
+
+_cluster_time_available: Optional[bool] = None
+
+
+def cluster_time_available() -> bool:
+    """$$CLUSTER_TIME (needed to stamp pipeline updates) exists on replica sets and mongos only."""
+    global _cluster_time_available
+    if _cluster_time_available is None:
+        try:
+            hello = db.command("hello")
+            _cluster_time_available = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        except PyMongoError:
+            return False
+    return _cluster_time_available
+
+
+XP_PROJECTION = {"xp": 1, "level": 1, "professionalism": 1}
+
+
+def xp_pipeline(delta: int, batch_id: Optional[ObjectId] = None) -> List[Dict[str, Any]]:
+    level, professionalism = level_expressions("$xp")
+    pipeline = [
+        {"$set": {"xp": {"$add": [{"$ifNull": ["$xp", 0]}, delta]}}},
+        {"$set": {"level": level, "professionalism": professionalism, CHANGE_FIELD: "$$CLUSTER_TIME"}},
+    ]
+    if batch_id is not None:
+        pipeline.append({"$set": {"xp_batches": {"$slice": [
+            {"$concatArrays": [{"$ifNull": ["$xp_batches", []]}, [batch_id]]}, -XP_BATCH_HISTORY,
+        ]}}})
+    return pipeline
+
+
+def stale_level(user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """compute_level() for the user's xp, or None if the stored fields already match."""
+    computed = compute_level(user.get("xp", 0))
+    if any(user.get(field) != value for field, value in computed.items()):
+        return computed
+    return None
+
+
+def apply_xp(object_id: ObjectId, delta: int, session=None) -> Optional[Dict[str, Any]]:
+    """Grant XP and recompute level/professionalism; returns the updated user fields."""
+    if cluster_time_available():
+        return db.users.find_one_and_update(
+            {"_id": object_id},
+            xp_pipeline(delta),
+            projection=XP_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+    # Standalone servers: $inc atomically, then correct the derived fields only
+    # if they changed and no other grant has moved xp in the meantime.
+    user = db.users.find_one_and_update(
+        {"_id": object_id},
+        stamp_update({"$inc": {"xp": delta}}),
+        projection=XP_PROJECTION,
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+    if user is None:
+        return None
+    computed = stale_level(user)
+    if computed:
+        db.users.update_one(
+            {"_id": object_id, "xp": user.get("xp", 0)},
+            stamp_update({"$set": computed}),
+            session=session,
+        )
+        user.update(computed)
+    return user
+
+
 def add_xp(user_id: str, delta: int) -> Dict[str, Any]:
     object_id = parse_object_id(user_id)
     if not object_id:
@@ -134,21 +654,379 @@ def add_xp(user_id: str, delta: int) -> Dict[str, Any]:
     if delta == 0:
         user = db.users.find_one({"_id": object_id})
         return {"xp": user.get("xp", 0), **compute_level(user.get("xp", 0))}
-    db.users.update_one({"_id": object_id}, {"$inc": {"xp": delta}})
-    user = db.users.find_one({"_id": object_id})
+    if xp_buffer is not None:
+        return xp_buffer.add(user_id, object_id, delta)
+    def grant(session):
+        user = apply_xp(object_id, delta, session)
+        if user is None:
+            raise ValueError("user not found")
+        return user
+
+    user = mirror_change(user_id, "level", write=grant)
     xp = user.get("xp", 0)
-    computed = compute_level(xp)
-    db.users.update_one({"_id": object_id}, {"$set": computed})
-
-    freelancer = db.freelancers.find_one({"user_id": user_id})
-    if freelancer:
-        db.freelancers.update_one(
-            {"user_id": user_id},
-            {"$set": {"professionalism": computed["professionalism"], "level": computed["level"], "updated_at": datetime.utcnow()}}
-        )
+    computed = {"level": user["level"], "professionalism": user["professionalism"]}
+    leaderboard.record_xp(user_id, xp, delta)
+    log_xp_events({user_id: delta})
+    invalidate_profile(user_id)
     return {"xp": xp, **computed}
 
 
+# ---------------------------------------------------------------------------
+# Write-behind XP buffer (XP_WRITE_BEHIND=1).
+# ---------------------------------------------------------------------------
+
+# Write-behind batches applied per user, remembered so a retried batch is a no-op.
+XP_BATCH_HISTORY = 32
+
+
+def write_xp_batch(batch_id: ObjectId, deltas: Dict[str, int]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Apply coalesced XP deltas to users with one bulk write instead of one round trip per grant.
+
+    Each update only matches users whose xp_batches do not hold `batch_id`
+    yet, so a batch whose outcome is unknown (network error, write concern
+    error) can be sent again as-is. Returns the XP fields of the updated
+    users and the deltas whose statements were rejected.
+    """
+    user_ids = list(deltas)
+    if cluster_time_available():
+        operations = [
+            UpdateOne({"_id": ObjectId(user_id), "xp_batches": {"$ne": batch_id}}, xp_pipeline(delta, batch_id))
+            for user_id, delta in deltas.items()
+        ]
+    else:
+        operations = [
+            UpdateOne({"_id": ObjectId(user_id), "xp_batches": {"$ne": batch_id}}, stamp_update({
+                "$inc": {"xp": delta},
+                "$push": {"xp_batches": {"$each": [batch_id], "$slice": -XP_BATCH_HISTORY}},
+            }))
+            for user_id, delta in deltas.items()
+        ]
+    rejected: Dict[str, int] = {}
+    try:
+        db.users.bulk_write(operations, ordered=False)
+    except BulkWriteError as exc:
+        if exc.details.get("writeConcernErrors"):
+            raise
+        # Unordered: every statement not listed here was applied.
+        for error in exc.details.get("writeErrors", []):
+            user_id = user_ids[error["index"]]
+            rejected[user_id] = deltas[user_id]
+    applied = [ObjectId(user_id) for user_id in user_ids if user_id not in rejected]
+    users = list(db.users.find({"_id": {"$in": applied}}, XP_PROJECTION)) if applied else []
+    if not cluster_time_available():
+        fixes = []
+        for user in users:
+            computed = stale_level(user)
+            if computed:
+                fixes.append(UpdateOne({"_id": user["_id"], "xp": user.get("xp", 0)}, stamp_update({"$set": computed})))
+                user.update(computed)
+        if fixes:
+            try:
+                db.users.bulk_write(fixes, ordered=False)
+            except PyMongoError as exc:
+                # xp itself is right; the next grant recomputes the level.
+                app.logger.warning("xp level fix failed: %s", exc)
+    return users, rejected
+
+
+def mirror_xp_levels(user_ids: List[str]):
+    """Copy level/professionalism to the freelancer mirror, via the outbox if the direct write fails."""
+    if not user_ids:
+        return
+    try:
+        apply_mirror_updates({user_id: {"parts": {"level"}, "refresh_feed": False} for user_id in user_ids})
+        return
+    except PyMongoError as exc:
+        app.logger.warning("xp mirror failed, queued to outbox: %s", exc)
+    now = datetime.utcnow()
+    try:
+        db.outbox.insert_many([
+            {"user_id": user_id, "parts": ["level"], "refresh_feed": False, "created_at": now}
+            for user_id in user_ids
+        ], ordered=False)
+        outbox_worker.wake()
+    except PyMongoError as exc:
+        app.logger.warning("xp mirror events not queued: %s", exc)
+
+
+class XPBuffer:
+    """Coalesces XP grants per user and flushes them in the background.
+
+    Grants return the projected XP (persisted xp + unwritten deltas) right
+    away. A background thread flushes every `interval` seconds, or sooner
+    once `flush_size` users are pending. At `max_users` new users wait for a
+    synchronous flush, so the buffer stays bounded.
+
+    Every flush is a batch with its own id. A batch that fails is kept
+    whole, minus statements known to have applied, and re-sent under the
+    same id before new grants, so write_xp_batch() never applies it twice.
+    """
+
+    def __init__(self, interval: float = 2.0, flush_size: int = 500, max_users: int = 10000):
+        self.interval = interval
+        self.flush_size = flush_size
+        self.max_users = max_users
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._deltas: Dict[str, int] = {}
+        # The batch being written, or the failed batch waiting to be re-sent.
+        self._batch_id: Optional[ObjectId] = None
+        self._batch: Dict[str, int] = {}
+        # Persisted xp for every user with unwritten deltas; bumped _epoch
+        # tells add() that a flush has finished and may have moved it.
+        self._base: Dict[str, int] = {}
+        self._epoch = 0
+        self._oldest: Optional[float] = None
+        self.flushes = 0
+        self.flushed_users = 0
+        self.errors = 0
+        self.last_flush_at: Optional[datetime] = None
+        self.last_flush_lag = 0.0
+        self.last_flush_seconds = 0.0
+
+    def _projected(self, user_id: str) -> int:
+        return self._base[user_id] + self._batch.get(user_id, 0) + self._deltas.get(user_id, 0)
+
+    def add(self, user_id: str, object_id: ObjectId, delta: int) -> Dict[str, Any]:
+        with self._lock:
+            full = user_id not in self._deltas and len(self._deltas) >= self.max_users
+        if full:
+            self.flush()
+        persisted, epoch = None, None
+        while True:
+            with self._lock:
+                if user_id not in self._base and persisted is not None and epoch == self._epoch:
+                    self._base[user_id] = persisted
+                if user_id in self._base:
+                    self._deltas[user_id] = self._deltas.get(user_id, 0) + delta
+                    if self._oldest is None:
+                        self._oldest = time.monotonic()
+                    xp = self._projected(user_id)
+                    if len(self._deltas) >= self.flush_size:
+                        self._wake.set()
+                    break
+                epoch = self._epoch
+            # Read outside the lock; if a flush finishes meanwhile, read again.
+            user = db.users.find_one({"_id": object_id}, {"xp": 1})
+            if user is None:
+                raise ValueError("user not found")
+            persisted = user.get("xp", 0)
+        leaderboard.record_xp(user_id, xp, delta)
+        return {"xp": xp, **compute_level(xp)}
+
+    def _flush_batch(self) -> Tuple[int, bool]:
+        """Write one batch; returns (users written, whether to go on with the next one)."""
+        with self._lock:
+            if not self._batch:
+                if not self._deltas:
+                    return 0, False
+                self._batch_id, self._batch, self._deltas = ObjectId(), self._deltas, {}
+                oldest, self._oldest = self._oldest, None
+            else:
+                oldest = None
+            batch_id, deltas = self._batch_id, dict(self._batch)
+        started = time.monotonic()
+        try:
+            users, rejected = write_xp_batch(batch_id, deltas)
+        except PyMongoError as exc:
+            app.logger.warning("xp flush failed, %d users kept for retry: %s", len(deltas), exc)
+            with self._lock:
+                self.errors += 1
+                self._epoch += 1
+                if oldest is not None:
+                    self._oldest = min(oldest, self._oldest or oldest)
+            return 0, False
+        persisted = {str(user["_id"]): user.get("xp", 0) for user in users}
+        with self._lock:
+            self._epoch += 1
+            self._batch = rejected
+            if not rejected:
+                self._batch_id = None
+            for user_id in deltas:
+                if user_id in rejected:
+                    continue
+                if user_id in self._deltas and user_id in persisted:
+                    self._base[user_id] = persisted[user_id]
+                elif user_id in self._deltas:
+                    self._base[user_id] += deltas[user_id]
+                else:
+                    self._base.pop(user_id, None)
+            if rejected:
+                self.errors += 1
+                app.logger.warning("xp flush rejected %d users, kept for retry", len(rejected))
+            self.flushes += 1
+            self.flushed_users += len(deltas) - len(rejected)
+            self.last_flush_at = datetime.utcnow()
+            if oldest is not None:
+                self.last_flush_lag = round(started - oldest, 3)
+            self.last_flush_seconds = round(time.monotonic() - started, 3)
+        written = {user_id: delta for user_id, delta in deltas.items() if user_id not in rejected}
+        log_xp_events(written)
+        mirror_xp_levels(list(persisted))
+        return len(written), not rejected
+
+    def flush(self) -> int:
+        """Write out everything pending; returns the number of users flushed."""
+        with self._flush_lock:
+            total = 0
+            while True:
+                written, more = self._flush_batch()
+                total += written
+                if not more:
+                    return total
+
+    def run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as exc:
+                app.logger.warning("xp flush failed: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending_users": len(self._deltas.keys() | self._batch.keys()),
+                "pending_xp": sum(self._deltas.values()) + sum(self._batch.values()),
+                "lag_seconds": round(time.monotonic() - self._oldest, 3) if self._oldest else 0.0,
+                "last_flush_lag_seconds": self.last_flush_lag,
+                "last_flush_seconds": self.last_flush_seconds,
+                "last_flush_at": self.last_flush_at,
+                "flushes": self.flushes,
+                "flushed_users": self.flushed_users,
+                "errors": self.errors,
+            }
+
+
+xp_buffer: Optional[XPBuffer] = None
+if os.getenv("XP_WRITE_BEHIND", "0").lower() in {"1", "true", "yes"}:
+    xp_buffer = XPBuffer(
+        interval=float(os.getenv("XP_FLUSH_INTERVAL", "2")),
+        flush_size=int(os.getenv("XP_FLUSH_SIZE", "500")),
+        max_users=int(os.getenv("XP_BUFFER_MAX_USERS", "10000")),
+    )
+    atexit.register(xp_buffer.flush)
+
+
+# ---------------------------------------------------------------------------
+# Password hashing on a dedicated, bounded pool.
+# ---------------------------------------------------------------------------
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "64"))
+PASSWORD_TIMEOUT = float(os.getenv("PASSWORD_TIMEOUT", "5"))
+
+
+class PasswordHasherBusy(Exception):
+    """The hashing queue is full or a hash did not finish in time."""
+
+
+class PasswordHasher:
+    """Runs bcrypt off the request threads.
+
+    bcrypt releases the GIL, so `workers` threads use that many cores.
+    Requests only wait on a future, and cheap endpoints keep being served.
+    At most `workers + queue_limit` hashes are accepted at once; beyond
+    that, or past `timeout`, callers get PasswordHasherBusy.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 1, queue_limit: int = 64, timeout: float = 5.0):
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max(1, workers) + queue_limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.rehashed = 0
+
+    def _done(self, _future):
+        self._slots.release()
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def _submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy("too many password operations in progress")
+        with self._lock:
+            self.in_flight += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _wait(self, future: Future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise PasswordHasherBusy("password operation timed out")
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+
+    def hash(self, password: str) -> str:
+        return self._wait(self._submit(self._hash, password))
+
+    def check(self, password: str, hashed: str) -> bool:
+        return self._wait(self._submit(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8')))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def rehash_later(self, object_id: ObjectId, password: str, old_hash: str):
+        """Re-hash at the configured cost in the background; skipped if the pool is busy."""
+        def store(future: Future):
+            if future.cancelled() or future.exception() is not None:
+                return
+            try:
+                db.users.update_one(
+                    {"_id": object_id, "password": old_hash},
+                    stamp_update({"$set": {"password": future.result()}}),
+                )
+                with self._lock:
+                    self.rehashed += 1
+            except PyMongoError as exc:
+                app.logger.warning("password rehash not stored: %s", exc)
+        try:
+            self._submit(self._hash, password).add_done_callback(store)
+        except PasswordHasherBusy:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "rehashed": self.rehashed,
+            }
+
+
+password_hasher = PasswordHasher(BCRYPT_ROUNDS, PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT, PASSWORD_TIMEOUT)
+
+
+def busy_response(error: Any, status: int = 503, retry_after: float = 1):
+    response = jsonify({"error": str(error)})
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
 def ensure_test_admin():
     if os.getenv("SEED_TEST_ADMIN") != "1":
         return
@@ -159,7 +1037,7 @@ def ensure_test_admin():
         return
     user = {
         "email": email,
-        "password": bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8'),
+        "password": password_hasher.hash(password),
         "fullName": "Test Admin",
         "role": "admin",
         "xp": 0,
@@ -168,15 +1046,1991 @@ def ensure_test_admin():
         "egov_auth": False,
         "created_at": datetime.utcnow()
     }
-    db.users.insert_one(user)
+    db.users.insert_one(stamp_insert(user))
+
+
+XP_EVENT_TTL_DAYS = int(os.getenv("XP_EVENT_TTL_DAYS", "62"))
+
+# Feed candidate queries match skills case-insensitively, like normalize_skill().
+SKILL_COLLATION = Collation(locale="en", strength=CollationStrength.SECONDARY)
+
+# Declarative index registry. Every query shape used by the routes below
+# should be served by one of these; `flask indexes` reports drift.
+INDEXES = {
+    "users": [
+        IndexModel(
+            [("email", ASCENDING)],
+            name="email_unique",
+            unique=True,
+            partialFilterExpression={"email": {"$type": "string"}},
+        ),
+        IndexModel(
+            [("iin_hash", ASCENDING)],
+            name="iin_hash_unique",
+            unique=True,
+            partialFilterExpression={"iin_hash": {"$type": "string"}},
+        ),
+        IndexModel([("phone", ASCENDING)], name="phone"),
+    ],
+    "freelancers": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # Directory filters (list_freelancers); skills/languages are multikey.
+        IndexModel([("skills", ASCENDING), ("rating", DESCENDING)], name="skills_rating"),
+        IndexModel([("languages", ASCENDING)], name="languages"),
+        # Feed fan-out (fan_out_job) matches skills under SKILL_COLLATION.
+        IndexModel([("skills", ASCENDING)], name="skills_ci", collation=SKILL_COLLATION),
+        IndexModel(
+            [("experience.skills_used", ASCENDING)],
+            name="experience_skills_used_ci",
+            collation=SKILL_COLLATION,
+        ),
+        IndexModel([("location", ASCENDING), ("rating", DESCENDING)], name="location_rating"),
+        IndexModel([("level", ASCENDING), ("rating", DESCENDING)], name="level_rating"),
+        IndexModel([("rating", DESCENDING), ("_id", DESCENDING)], name="rating"),
+        IndexModel([("hourly_rate", ASCENDING), ("_id", ASCENDING)], name="hourly_rate"),
+        IndexModel([("_changed", ASCENDING), ("_id", ASCENDING)], name="changed_id"),
+    ],
+    "jobs": [
+        IndexModel(
+            [("category", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="category_created_at",
+        ),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at"),
+        IndexModel(
+            [("skills", ASCENDING), ("created_at", DESCENDING)],
+            name="skills_created_at_ci",
+            collation=SKILL_COLLATION,
+        ),
+        IndexModel([("_changed", ASCENDING), ("_id", ASCENDING)], name="changed_id"),
+    ],
+    "reviews": [
+        IndexModel([("freelancer_id", ASCENDING), ("_changed", DESCENDING)], name="freelancer_id_changed"),
+        IndexModel(
+            [("freelancer_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="freelancer_id_created_at",
+        ),
+        IndexModel([("_changed", ASCENDING), ("_id", ASCENDING)], name="changed_id"),
+    ],
+    "projects": [
+        IndexModel([("freelancer_id", ASCENDING), ("_changed", DESCENDING)], name="freelancer_id_changed"),
+        IndexModel(
+            [("freelancer_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="freelancer_id_created_at",
+        ),
+        IndexModel([("_changed", ASCENDING), ("_id", ASCENDING)], name="changed_id"),
+    ],
+    "messages": [
+        IndexModel([("participants", ASCENDING)], name="participants"),
+        IndexModel([("_changed", ASCENDING), ("_id", ASCENDING)], name="changed_id"),
+    ],
+    "education": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("_changed", ASCENDING), ("_id", ASCENDING)], name="changed_id"),
+    ],
+    "experience": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("_changed", ASCENDING), ("_id", ASCENDING)], name="changed_id"),
+    ],
+    "clients": [
+        IndexModel([("_changed", ASCENDING), ("_id", ASCENDING)], name="changed_id"),
+    ],
+    "xp_events": [
+        IndexModel([("at", ASCENDING)], name="at_ttl", expireAfterSeconds=XP_EVENT_TTL_DAYS * 86400),
+    ],
+    "tombstones": [
+        IndexModel([("collection", ASCENDING), ("_changed", ASCENDING), ("_id", ASCENDING)], name="collection_changed_id"),
+    ],
+}
+
+
+def ensure_indexes() -> Dict[str, Any]:
+    """Create every registered index. Safe to run repeatedly.
+
+    Errors are keyed "<collection>.<index>". One bad index does not keep the
+    rest of its collection from being created.
+    """
+    created = {}
+    errors = {}
+    for collection, models in INDEXES.items():
+        try:
+            created[collection] = db[collection].create_indexes(models)
+        except OperationFailure:
+            # Usually an index with the same name but different options, or
+            # duplicate values blocking a unique index. create_indexes is one
+            # command, so retry index by index to find it and keep the others.
+            created[collection] = []
+            for model in models:
+                try:
+                    created[collection].extend(db[collection].create_indexes([model]))
+                except OperationFailure as exc:
+                    errors[f"{collection}.{model.document['name']}"] = str(exc)
+    return {"created": created, "errors": errors}
+
+
+def index_report() -> Dict[str, Any]:
+    """Compare the registry with the live database.
+
+    missing: registered but not present
+    unexpected: present but not registered (the default _id_ index excluded)
+    unused: present with zero recorded accesses since the server started
+    """
+    report = {}
+    for collection, models in INDEXES.items():
+        expected = {model.document["name"] for model in models}
+        existing = set(db[collection].index_information().keys()) - {"_id_"}
+        try:
+            stats = db[collection].aggregate([{"$indexStats": {}}])
+            unused = sorted(
+                stat["name"] for stat in stats
+                if stat["name"] != "_id_" and stat.get("accesses", {}).get("ops", 0) == 0
+            )
+        except OperationFailure:
+            unused = []
+        report[collection] = {
+            "missing": sorted(expected - existing),
+            "unexpected": sorted(existing - expected),
+            "unused": unused,
+        }
+    return report
+
+
+@app.cli.command("backfill-changes")
+def backfill_changes_command():
+    """Stamp documents written before change markers existed."""
+    for collection in SYNC_COLLECTIONS:
+        result = db[collection].update_many(
+            {CHANGE_FIELD: {"$exists": False}},
+            stamp_update({}),
+        )
+        click.echo(f"{collection}: {result.modified_count}")
+
+
+@app.cli.command("rebuild-ratings")
+def rebuild_ratings_command():
+    """Recompute freelancer rating aggregates from the reviews collection."""
+    rows = db.reviews.aggregate([
+        {"$match": {"freelancer_id": {"$type": "string"}, "rating": {"$gte": 1, "$lte": 5}}},
+        {"$group": {
+            "_id": {"freelancer_id": "$freelancer_id", "stars": {"$floor": {"$add": ["$rating", 0.5]}}},
+            "count": {"$sum": 1},
+            "total": {"$sum": "$rating"},
+        }},
+        {"$group": {
+            "_id": "$_id.freelancer_id",
+            "count": {"$sum": "$count"},
+            "total": {"$sum": "$total"},
+            "histogram": {"$push": {"stars": "$_id.stars", "count": "$count"}},
+        }},
+    ], allowDiskUse=True)
+    updated = 0
+    operations = []
+    for row in rows:
+        object_id = parse_object_id(row["_id"])
+        if not object_id:
+            continue
+        operations.append(UpdateOne({"_id": object_id}, stamp_update({"$set": {
+            "rating_count": row["count"],
+            "rating_sum": row["total"],
+            "rating_histogram": {str(int(bucket["stars"])): bucket["count"] for bucket in row["histogram"]},
+            "rating": bayesian_rating(row["count"], row["total"]),
+        }})))
+        if len(operations) >= STREAM_BATCH_SIZE:
+            updated += db.freelancers.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += db.freelancers.bulk_write(operations, ordered=False).modified_count
+    click.echo(f"freelancers: {updated}")
+
+
+@app.cli.command("indexes")
+@click.option("--report", "report_only", is_flag=True, help="Only report missing/unused indexes.")
+def indexes_command(report_only):
+    """Apply the index registry and report drift."""
+    if not report_only:
+        result = ensure_indexes()
+        for collection, names in result["created"].items():
+            click.echo(f"{collection}: {', '.join(names)}")
+        for name, error in result["errors"].items():
+            click.echo(f"{name}: ERROR {error}", err=True)
+    for collection, info in index_report().items():
+        for key in ("missing", "unexpected", "unused"):
+            if info[key]:
+                click.echo(f"{collection}: {key} {', '.join(info[key])}")
+
+
+# ---------------------------------------------------------------------------
+# Job search: in-process inverted index with BM25F-style ranking.
+# ---------------------------------------------------------------------------
+
+SEARCH_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+SEARCH_STOPWORDS = frozenset({
+    # English
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "to", "with",
+    # Russian
+    "а", "в", "во", "для", "и", "из", "к", "как", "на", "не", "о", "от", "по",
+    "с", "со", "у", "что", "это",
+    # Kazakh
+    "және", "мен", "бен", "пен", "да", "де", "та", "те", "үшін", "бұл", "сол",
+})
+
+
+def tokenize(text: Any) -> List[str]:
+    """Split Russian/Kazakh/English text into case-folded search terms."""
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = " ".join(str(item) for item in text if item)
+    text = str(text).casefold().replace("ё", "е")
+    return [token for token in SEARCH_TOKEN_RE.findall(text) if token not in SEARCH_STOPWORDS]
+
+
+class JobSearchIndex:
+    """Inverted index over jobs.title/skills/description.
+
+    Term frequencies are weighted per field (BM25F-style) and documents are
+    scored with BM25. The last query term also matches as a prefix so that
+    search-as-you-type keeps working like the old regex search did. Prefixes
+    shorter than PREFIX_MIN_LENGTH only match whole terms, and longer ones
+    expand to their PREFIX_EXPANSIONS most frequent completions.
+
+    Every job gets a slot; postings map term -> {slot: tf} and are compiled
+    into numpy arrays on first use, so a query is a few vectorized passes.
+    Scoring runs on a snapshot taken under the lock, so writers are only
+    blocked while the arrays are collected.
+    """
+
+    FIELD_WEIGHTS = {"title": 3.0, "skills": 2.0, "description": 1.0}
+    PROJECTION = {"title": 1, "skills": 1, "description": 1, "category": 1}
+    PREFIX_MIN_LENGTH = 2
+    PREFIX_EXPANSIONS = 8
+    PREFIX_SCAN = 2000
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        self._lock = threading.RLock()
+        self._pending: Optional[List[Dict[str, Any]]] = None
+        self._reset()
+
+    def _reset(self):
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._compiled: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._doc_terms: Dict[int, List[str]] = {}
+        self._slot_of: Dict[str, int] = {}
+        self._ids: List[str] = []
+        # job ids as bytes, so ties on score break on job_id inside numpy.
+        self._id_keys = np.zeros(0, dtype="S24")
+        self._lengths = np.zeros(0, dtype=np.float64)
+        self._category_codes = np.zeros(0, dtype=np.int32)
+        self._categories: Dict[Any, int] = {}
+        self._vocabulary: List[str] = []
+        self._total_length = 0.0
+
+    def _weighted_terms(self, doc: Dict[str, Any]) -> Dict[str, float]:
+        terms: Dict[str, float] = {}
+        for field, weight in self.FIELD_WEIGHTS.items():
+            for token in tokenize(doc.get(field)):
+                terms[token] = terms.get(token, 0.0) + weight
+        return terms
+
+    def _add(self, doc: Dict[str, Any]):
+        job_id = str(doc["_id"])
+        slot = self._slot_of.get(job_id)
+        if slot is None:
+            slot = len(self._ids)
+            self._slot_of[job_id] = slot
+            self._ids.append(job_id)
+            self._id_keys = grow(self._id_keys, slot + 1, b"")
+            self._id_keys[slot] = job_id.encode("ascii")
+            self._lengths = grow(self._lengths, slot + 1, 0)
+            self._category_codes = grow(self._category_codes, slot + 1, -1)
+        else:
+            self._clear(slot)
+        terms = self._weighted_terms(doc)
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._vocabulary, term)
+            postings[slot] = tf
+            self._compiled.pop(term, None)
+        length = sum(terms.values())
+        self._doc_terms[slot] = list(terms)
+        self._lengths[slot] = length
+        self._category_codes[slot] = self._categories.setdefault(doc.get("category"), len(self._categories))
+        self._total_length += length
+
+    def _clear(self, slot: int):
+        """Drop the postings of `slot`; the slot itself stays reserved for its job."""
+        terms = self._doc_terms.pop(slot, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(slot, None)
+            self._compiled.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+        self._total_length -= self._lengths[slot]
+        self._lengths[slot] = 0
+        self._category_codes[slot] = -1
+
+    def add(self, doc: Dict[str, Any]):
+        with self._lock:
+            self._add(doc)
+            if self._pending is not None:
+                self._pending.append(doc)
+
+    def remove(self, job_id: str):
+        with self._lock:
+            slot = self._slot_of.get(str(job_id))
+            if slot is not None:
+                self._clear(slot)
+
+    def rebuild(self, docs):
+        """Replace the index with `docs`, keeping writes made meanwhile."""
+        with self._lock:
+            self._pending = []
+        fresh = JobSearchIndex(self.k1, self.b)
+        for doc in docs:
+            fresh._add(doc)
+        with self._lock:
+            for doc in self._pending:
+                fresh._add(doc)
+            self._pending = None
+            self._postings = fresh._postings
+            self._compiled = fresh._compiled
+            self._doc_terms = fresh._doc_terms
+            self._slot_of = fresh._slot_of
+            self._ids = fresh._ids
+            self._id_keys = fresh._id_keys
+            self._lengths = fresh._lengths
+            self._category_codes = fresh._category_codes
+            self._categories = fresh._categories
+            self._vocabulary = fresh._vocabulary
+            self._total_length = fresh._total_length
+            self.ready = True
+
+    def _expand(self, term: str) -> List[str]:
+        if len(term) < self.PREFIX_MIN_LENGTH:
+            return [term]
+        start = bisect.bisect_left(self._vocabulary, term)
+        candidates = []
+        for candidate in itertools.islice(self._vocabulary, start, start + self.PREFIX_SCAN):
+            if not candidate.startswith(term):
+                break
+            candidates.append(candidate)
+        completions = heapq.nlargest(self.PREFIX_EXPANSIONS, candidates,
+                                     key=lambda candidate: len(self._postings[candidate]))
+        if term in self._postings and term not in completions:
+            completions.append(term)
+        return completions
+
+    def _arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        compiled = self._compiled.get(term)
+        if compiled is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return None
+            compiled = self._compiled[term] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings)),
+            )
+        return compiled
+
+    def search(self, query: str, category: Optional[str] = None, limit: Optional[int] = None,
+               after: Optional[Tuple[float, str]] = None) -> List[Tuple[float, str]]:
+        """Return (score, job_id) pairs, best first, strictly after `after`."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if not n_docs:
+                return []
+            if category and category not in self._categories:
+                return []
+            avg_length = self._total_length / n_docs
+            terms = set(tokens[:-1]) | set(self._expand(tokens[-1]))
+            postings = [arrays for arrays in map(self._arrays, terms) if arrays is not None]
+            # Slots are never reassigned and growing replaces the arrays, so
+            # ids and id_keys stay valid after unlocking; lengths and
+            # categories are rewritten in place on update and are copied.
+            size = len(self._ids)
+            ids = self._ids
+            id_keys = self._id_keys[:size]
+            lengths = self._lengths[:size].copy()
+            category_codes = self._category_codes[:size].copy() if category else None
+            category_code = self._categories.get(category)
+        if not postings:
+            return []
+        scores = np.zeros(size, dtype=np.float64)
+        base = self.k1 * (1 - self.b)
+        scale = self.k1 * self.b / avg_length
+        for slots, tfs in postings:
+            df = len(slots)
+            weight = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * (self.k1 + 1)
+            scores[slots] += weight * tfs / (tfs + base + scale * lengths[slots])
+        if category_codes is not None:
+            scores[category_codes != category_code] = 0
+        if after is not None:
+            after_score, after_id = after
+            before = (scores < after_score) | ((scores == after_score) & (id_keys < after_id.encode("ascii")))
+            scores[~before] = 0
+        matched = np.flatnonzero(scores)
+        if limit is not None and len(matched) > limit:
+            # Keep every slot tied with the limit-th score so ties still break on job_id.
+            threshold = np.partition(scores[matched], len(matched) - limit)[len(matched) - limit]
+            matched = matched[scores[matched] >= threshold]
+        order = np.lexsort((id_keys[matched], scores[matched]))[::-1]
+        if limit is not None:
+            order = order[:limit]
+        matched = matched[order]
+        return [(score, ids[slot]) for slot, score in zip(matched.tolist(), scores[matched].tolist())]
+
+
+job_search = JobSearchIndex()
+
+
+def rebuild_job_search():
+    try:
+        job_search.rebuild(db.jobs.find({}, JobSearchIndex.PROJECTION).batch_size(STREAM_BATCH_SIZE))
+    except PyMongoError as exc:
+        app.logger.warning("job search index not built: %s", exc)
+
+
+def fetch_in_order(collection, object_ids: List[ObjectId], projection: Optional[Dict[str, int]] = None):
+    """Yield documents for `object_ids` in the given order, one $in per batch."""
+    for start in range(0, len(object_ids), STREAM_BATCH_SIZE):
+        chunk = object_ids[start:start + STREAM_BATCH_SIZE]
+        by_id = {doc["_id"]: doc for doc in collection.find({"_id": {"$in": chunk}}, projection)}
+        for object_id in chunk:
+            doc = by_id.get(object_id)
+            if doc is not None:
+                yield doc
+
+
+def search_jobs_response(search: str, category: Optional[str], projection: Optional[Dict[str, int]]):
+    """Relevance-ranked variant of list_response() backed by job_search."""
+    try:
+        page = parse_page_args()
+        after = None
+        if page and page[1]:
+            score, last_id = decode_cursor(page[1])
+            after = (float(score), str(last_id))
+    except (ValueError, TypeError):
+        return jsonify({"error": "invalid cursor"}), 400
+    limit = page[0] if page else None
+    ranked = job_search.search(search, category, limit + 1 if limit else None, after)
+    next_cursor = None
+    if limit and len(ranked) > limit:
+        ranked = ranked[:limit]
+        score, last_id = ranked[-1]
+        next_cursor = encode_cursor({"score": score, "_id": ObjectId(last_id)}, "score")
+    docs = fetch_in_order(db.jobs, [ObjectId(job_id) for _, job_id in ranked], projection)
+    if wants_ndjson():
+        def generate():
+            for doc in docs:
+                yield app.json.dumps(serialize(doc)) + "\n"
+            yield app.json.dumps({"next_cursor": next_cursor}) + "\n"
+        return Response(generate(), mimetype=NDJSON_MIMETYPE)
+    items = [serialize(doc) for doc in docs]
+    if page is None:
+        return jsonify(items)
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+
+# ---------------------------------------------------------------------------
+# Skill autocomplete: sorted array of normalized skills, weighted by usage.
+# ---------------------------------------------------------------------------
+
+def normalize_skill(skill: Any) -> str:
+    return " ".join(str(skill).split()).casefold()
+
+
+class SkillIndex:
+    """Counts of every skill used by freelancers and jobs, searchable by prefix.
+
+    A skill counts once per document that lists it. Keys are kept in a sorted
+    list so a prefix is a bisect range; results for a prefix are cached until
+    the next change.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._lock = threading.RLock()
+        self._pending: Optional[List[Tuple[Any, List[str], int]]] = None
+        self._counts: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}
+        self._keys: List[str] = []
+        self._cache: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+
+    def _apply(self, skill: Any, delta: int):
+        key = normalize_skill(skill)
+        if not key:
+            return
+        count = self._counts.get(key, 0) + delta
+        if count > 0:
+            if key not in self._counts:
+                bisect.insort(self._keys, key)
+                self._names[key] = " ".join(str(skill).split())
+            self._counts[key] = count
+        elif key in self._counts:
+            del self._counts[key]
+            del self._names[key]
+            del self._keys[bisect.bisect_left(self._keys, key)]
+
+    @staticmethod
+    def _distinct(skills) -> Dict[str, str]:
+        if isinstance(skills, str):
+            skills = [skills]
+        distinct = {}
+        for skill in skills or ():
+            if isinstance(skill, str) and normalize_skill(skill):
+                distinct.setdefault(normalize_skill(skill), skill)
+        return distinct
+
+    def update(self, source: Any, skills, delta: int = 1):
+        """Record that document `source` gained (+1) or lost (-1) `skills`."""
+        skills = list(self._distinct(skills).values())
+        if not skills:
+            return
+        with self._lock:
+            for skill in skills:
+                self._apply(skill, delta)
+            if self._pending is not None:
+                self._pending.append((source, skills, delta))
+            self._cache.clear()
+
+    def rebuild(self, docs):
+        """Replace all counts with `docs`, (source, skills) pairs, keeping writes made meanwhile.
+
+        A write may land before or after the scan reads its document, so
+        pending deltas are not replayed as-is: for each (source, skill) the
+        last write says whether the skill is there now, and only the
+        difference from what the scan saw is applied.
+        """
+        with self._lock:
+            self._pending = []
+        fresh = SkillIndex()
+        seen: Dict[Any, frozenset] = {}
+        for source, skills in docs:
+            distinct = self._distinct(skills)
+            for skill in distinct.values():
+                fresh._apply(skill, 1)
+            seen[source] = frozenset(distinct)
+        with self._lock:
+            latest: Dict[Tuple[Any, str], Tuple[str, bool]] = {}
+            for source, skills, delta in self._pending:
+                for skill in skills:
+                    latest[(source, normalize_skill(skill))] = (skill, delta > 0)
+            for (source, key), (skill, present) in latest.items():
+                correction = int(present) - int(key in seen.get(source, ()))
+                if correction:
+                    fresh._apply(skill, correction)
+            self._pending = None
+            self._counts = fresh._counts
+            self._names = fresh._names
+            self._keys = fresh._keys
+            self._cache.clear()
+            self.ready = True
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        prefix = normalize_skill(prefix)
+        with self._lock:
+            cached = self._cache.get((prefix, limit))
+            if cached is not None:
+                return cached
+            start = bisect.bisect_left(self._keys, prefix)
+            end = bisect.bisect_left(self._keys, prefix + "\U0010ffff")
+            top = heapq.nsmallest(
+                limit,
+                itertools.islice(self._keys, start, end),
+                key=lambda key: (-self._counts[key], key),
+            )
+            result = [{"skill": self._names[key], "count": self._counts[key]} for key in top]
+            if len(self._cache) > 10000:
+                self._cache.clear()
+            self._cache[(prefix, limit)] = result
+            return result
+
+
+skill_index = SkillIndex()
+
+
+def skill_sources():
+    """(source, skills) for every freelancer and job; sources match the skill_index.update() calls."""
+    query = {"skills.0": {"$exists": True}}
+    for doc in db.freelancers.find(query, {"skills": 1, "user_id": 1}).batch_size(STREAM_BATCH_SIZE):
+        yield ("freelancers", doc.get("user_id")), doc["skills"]
+    for doc in db.jobs.find(query, {"skills": 1}).batch_size(STREAM_BATCH_SIZE):
+        yield ("jobs", str(doc["_id"])), doc["skills"]
+
+
+def rebuild_skill_index():
+    try:
+        skill_index.rebuild(skill_sources())
+    except PyMongoError as exc:
+        app.logger.warning("skill index not built: %s", exc)
+
+
+# ---------------------------------------------------------------------------
+# Job -> freelancer matching: sparse skill matrix scored with NumPy.
+# ---------------------------------------------------------------------------
+
+LEVEL_ORDER = {name: idx for idx, (name, _) in enumerate(LEVEL_THRESHOLDS)}
+NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def parse_amount(value: Any) -> Optional[float]:
+    """Best-effort number from a budget like 150000, "150 000 ₸" or "50.5"."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        match = NUMBER_RE.search(value.replace(" ", "").replace(" ", ""))
+        if match:
+            return float(match.group().replace(",", "."))
+    return None
+
+
+def grow(array, size: int, fill):
+    """Return `array` with room for at least `size` items (amortized doubling)."""
+    if size <= len(array):
+        return array
+    grown = np.full(max(size, 2 * len(array), 64), fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class FreelancerMatcher:
+    """Scores one job against every freelancer in a single vectorized pass.
+
+    Skills are stored as a COO sparse matrix (parallel row/column arrays) that
+    grows by appending; replaced rows are tombstoned (column -1) and the
+    arrays are compacted once half of the entries are dead.
+    """
+
+    PROJECTION = {"skills": 1, "hourly_rate": 1, "level": 1, "rating": 1, "location": 1}
+    WEIGHTS = {"skills": 0.6, "rating": 0.2, "level": 0.1, "rate": 0.1, "location": 0.05}
+
+    def __init__(self):
+        self.ready = False
+        self._lock = threading.RLock()
+        self._pending: Optional[List[Tuple[str, Any]]] = None
+        self._reset()
+
+    def _reset(self):
+        self._vocabulary: Dict[str, int] = {}
+        self._locations: Dict[str, int] = {}
+        self._row_of: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._entries_of: Dict[int, Tuple[int, int]] = {}
+        self._entry_rows = np.empty(0, dtype=np.int32)
+        self._entry_cols = np.empty(0, dtype=np.int32)
+        self._nnz = 0
+        self._dead = 0
+        self._active = np.zeros(0, dtype=bool)
+        self._rates = np.empty(0, dtype=np.float32)
+        self._ratings = np.zeros(0, dtype=np.float32)
+        self._levels = np.zeros(0, dtype=np.int8)
+        self._location_codes = np.empty(0, dtype=np.int32)
+
+    def _tombstone(self, row: int):
+        start, end = self._entries_of.pop(row, (0, 0))
+        self._entry_cols[start:end] = -1
+        self._dead += end - start
+
+    def _upsert(self, doc: Dict[str, Any]):
+        freelancer_id = str(doc["_id"])
+        row = self._row_of.get(freelancer_id)
+        if row is None:
+            row = len(self._ids)
+            self._row_of[freelancer_id] = row
+            self._ids.append(freelancer_id)
+            size = row + 1
+            self._active = grow(self._active, size, False)
+            self._rates = grow(self._rates, size, np.nan)
+            self._ratings = grow(self._ratings, size, 0)
+            self._levels = grow(self._levels, size, 0)
+            self._location_codes = grow(self._location_codes, size, -1)
+        else:
+            self._tombstone(row)
+
+        skills = doc.get("skills") if isinstance(doc.get("skills"), list) else []
+        columns = sorted({
+            self._vocabulary.setdefault(key, len(self._vocabulary))
+            for key in (normalize_skill(skill) for skill in skills) if key
+        })
+        start, end = self._nnz, self._nnz + len(columns)
+        self._entry_rows = grow(self._entry_rows, end, 0)
+        self._entry_cols = grow(self._entry_cols, end, -1)
+        self._entry_rows[start:end] = row
+        self._entry_cols[start:end] = columns
+        self._entries_of[row] = (start, end)
+        self._nnz = end
+
+        rate = parse_amount(doc.get("hourly_rate"))
+        location = (doc.get("location") or "").strip().casefold()
+        self._active[row] = True
+        self._rates[row] = np.nan if rate is None else rate
+        self._ratings[row] = parse_amount(doc.get("rating")) or 0
+        self._levels[row] = LEVEL_ORDER.get(doc.get("level"), 0)
+        self._location_codes[row] = (
+            self._locations.setdefault(location, len(self._locations)) if location else -1
+        )
+        if self._dead > 1024 and self._dead * 2 > self._nnz:
+            self._compact()
+
+    def _remove(self, freelancer_id: str):
+        row = self._row_of.get(freelancer_id)
+        if row is not None:
+            self._tombstone(row)
+            self._active[row] = False
+
+    def _compact(self):
+        live = self._entry_cols[:self._nnz] >= 0
+        rows = self._entry_rows[:self._nnz][live]
+        cols = self._entry_cols[:self._nnz][live]
+        # Rows are contiguous runs once sorted; rebuild the per-row spans.
+        order = np.argsort(rows, kind="stable")
+        rows, cols = rows[order], cols[order]
+        self._entry_rows, self._entry_cols = rows, cols
+        self._nnz, self._dead = len(rows), 0
+        self._entries_of = {}
+        if len(rows):
+            boundaries = np.flatnonzero(np.diff(rows)) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(rows)]))
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                self._entries_of[int(rows[start])] = (start, end)
+
+    def upsert(self, doc: Dict[str, Any]):
+        with self._lock:
+            self._upsert(doc)
+            if self._pending is not None:
+                self._pending.append(("upsert", doc))
+
+    def remove(self, freelancer_id: str):
+        with self._lock:
+            self._remove(str(freelancer_id))
+            if self._pending is not None:
+                self._pending.append(("remove", str(freelancer_id)))
+
+    def rebuild(self, docs):
+        """Replace the matrix with `docs`, keeping writes made meanwhile."""
+        with self._lock:
+            self._pending = []
+        fresh = FreelancerMatcher()
+        for doc in docs:
+            fresh._upsert(doc)
+        with self._lock:
+            for action, item in self._pending:
+                if action == "upsert":
+                    fresh._upsert(item)
+                else:
+                    fresh._remove(item)
+            self._pending = None
+            self.__dict__.update({
+                key: value for key, value in fresh.__dict__.items()
+                if key not in ("_lock", "_pending", "ready")
+            })
+            self.ready = True
+
+    def top_k(self, job: Dict[str, Any], k: int = 20) -> List[Tuple[float, str]]:
+        """Return up to k (score, freelancer_id) pairs, best first."""
+        job_skills = {normalize_skill(skill) for skill in job.get("skills") or [] if skill}
+        job_skills.discard("")
+        budget = parse_amount(job.get("hourly_rate")) or parse_amount(job.get("budget"))
+        job_level = LEVEL_ORDER.get(job.get("level"))
+        job_location = (job.get("location") or "").strip().casefold() if isinstance(job.get("location"), str) else ""
+        with self._lock:
+            n = len(self._ids)
+            if not n:
+                return []
+            active = self._active[:n]
+            weights = self.WEIGHTS
+            if job_skills:
+                columns = [self._vocabulary[key] for key in job_skills if key in self._vocabulary]
+                cols = self._entry_cols[:self._nnz]
+                hits = np.isin(cols, np.asarray(columns, dtype=np.int32))
+                overlap = np.bincount(self._entry_rows[:self._nnz][hits], minlength=n)[:n]
+                candidates = active & (overlap > 0)
+                score = weights["skills"] * overlap.astype(np.float32) / len(job_skills)
+            else:
+                candidates = active.copy()
+                score = np.zeros(n, dtype=np.float32)
+            score += weights["rating"] * np.clip(self._ratings[:n], 0, 5) / 5
+            max_level = max(len(LEVEL_ORDER) - 1, 1)
+            levels = self._levels[:n].astype(np.float32)
+            if job_level is None:
+                score += weights["level"] * levels / max_level
+            else:
+                score += weights["level"] * (1 - np.abs(levels - job_level) / max_level)
+            if budget:
+                rates = self._rates[:n]
+                fit = np.where(np.isnan(rates) | (rates <= 0), 0.5, np.clip(budget / np.where(rates > 0, rates, 1), 0, 1))
+                score += weights["rate"] * fit
+            if job_location and job_location in self._locations:
+                score += weights["location"] * (self._location_codes[:n] == self._locations[job_location])
+            count = int(candidates.sum())
+            k = min(k, count)
+            if k <= 0:
+                return []
+            score = np.where(candidates, score, -np.inf)
+            top = np.argpartition(-score, k - 1)[:k]
+            top = top[np.argsort(-score[top], kind="stable")]
+            return [(float(score[row]), self._ids[row]) for row in top]
+
+
+freelancer_matcher = FreelancerMatcher()
+
+
+def rebuild_freelancer_matcher():
+    try:
+        freelancer_matcher.rebuild(
+            db.freelancers.find({}, FreelancerMatcher.PROJECTION).batch_size(STREAM_BATCH_SIZE)
+        )
+    except PyMongoError as exc:
+        app.logger.warning("freelancer matcher not built: %s", exc)
+
+
+def sync_freelancer_match(user_id: str):
+    """Re-read one freelancer profile into the matcher and leaderboard after a change."""
+    doc = db.freelancers.find_one({"user_id": user_id}, {**FreelancerMatcher.PROJECTION, **Leaderboard.FREELANCER_PROJECTION})
+    if doc:
+        freelancer_matcher.upsert(doc)
+        leaderboard.update_freelancer(doc)
+
+
+# ---------------------------------------------------------------------------
+# Personalized job feeds, materialized per freelancer in job_feeds.
+# ---------------------------------------------------------------------------
+
+FEED_SIZE = int(os.getenv("FEED_SIZE", "100"))
+FEED_CANDIDATES = int(os.getenv("FEED_CANDIDATES", "1000"))
+FEED_FREELANCER_PROJECTION = {"user_id": 1, "title": 1, "skills": 1, "categories": 1, "experience.skills_used": 1}
+FEED_JOB_PROJECTION = {field: 1 for field in JOB_CARD_FIELDS}
+feed_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="feed")
+
+
+def run_in_background(executor, fn, *args):
+    def report(future):
+        exc = future.exception()
+        if exc is not None:
+            app.logger.warning("%s failed: %s", fn.__name__, exc)
+    executor.submit(fn, *args).add_done_callback(report)
+
+
+def profile_interests(freelancer: Dict[str, Any]) -> Tuple[set, set]:
+    """Skill keys (profile skills + experience.skills_used) and category hints."""
+    skills = set()
+    for skill in freelancer.get("skills") or []:
+        skills.add(normalize_skill(skill))
+    for item in freelancer.get("experience") or []:
+        for skill in item.get("skills_used") or []:
+            skills.add(normalize_skill(skill))
+    skills.discard("")
+    categories = {str(category).casefold() for category in freelancer.get("categories") or []}
+    categories.update(tokenize(freelancer.get("title")))
+    return skills, categories
+
+
+def feed_score(skills: set, categories: set, job: Dict[str, Any]) -> float:
+    job_skills = {normalize_skill(skill) for skill in job.get("skills") or [] if skill}
+    score = len(skills & job_skills) / len(job_skills) if job_skills else 0.0
+    if job.get("category") and str(job["category"]).casefold() in categories:
+        score += 0.25
+    return round(score, 4)
+
+
+def feed_entry(job: Dict[str, Any], score: float) -> Dict[str, Any]:
+    entry = {field: job[field] for field in JOB_CARD_FIELDS if field in job}
+    entry["job_id"] = str(job["_id"])
+    entry["score"] = score
+    return entry
+
+
+def recompute_feed(user_id: str) -> Optional[List[Dict[str, Any]]]:
+    """Rebuild one freelancer's feed from the newest jobs sharing a skill."""
+    freelancer = db.freelancers.find_one({"user_id": user_id}, FEED_FREELANCER_PROJECTION)
+    if not freelancer:
+        return None
+    skills, categories = profile_interests(freelancer)
+    raw_skills = list(freelancer.get("skills") or [])
+    for item in freelancer.get("experience") or []:
+        raw_skills.extend(item.get("skills_used") or [])
+    jobs = db.jobs.find({"skills": {"$in": raw_skills}}, FEED_JOB_PROJECTION, collation=SKILL_COLLATION) \
+        .sort([("created_at", DESCENDING), ("_id", DESCENDING)]).limit(FEED_CANDIDATES)
+    entries = []
+    for job in jobs:
+        score = feed_score(skills, categories, job)
+        if score > 0:
+            entries.append(feed_entry(job, score))
+    entries.sort(key=lambda entry: (entry["score"], entry.get("created_at") or datetime.min), reverse=True)
+    entries = entries[:FEED_SIZE]
+    db.job_feeds.replace_one(
+        {"_id": user_id},
+        {"_id": user_id, "jobs": entries, "updated_at": datetime.utcnow()},
+        upsert=True,
+    )
+    return entries
+
+
+def fan_out_job(job: Dict[str, Any]):
+    """Insert a new job into the materialized feeds of interested freelancers."""
+    raw_skills = [skill for skill in job.get("skills") or [] if skill]
+    if not raw_skills:
+        return
+    interested = db.freelancers.find(
+        {"$or": [{"skills": {"$in": raw_skills}}, {"experience.skills_used": {"$in": raw_skills}}]},
+        FEED_FREELANCER_PROJECTION,
+        collation=SKILL_COLLATION,
+    ).batch_size(STREAM_BATCH_SIZE)
+    operations = []
+    for freelancer in interested:
+        if not freelancer.get("user_id"):
+            continue
+        score = feed_score(*profile_interests(freelancer), job)
+        if score <= 0:
+            continue
+        # Feeds that were never materialized are built on first read instead.
+        operations.append(UpdateOne({"_id": freelancer["user_id"]}, {"$push": {"jobs": {
+            "$each": [feed_entry(job, score)],
+            "$sort": {"score": -1, "created_at": -1},
+            "$slice": FEED_SIZE,
+        }}}))
+        if len(operations) >= STREAM_BATCH_SIZE:
+            db.job_feeds.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        db.job_feeds.bulk_write(operations, ordered=False)
+
+
+def fan_out_jobs(jobs: List[Dict[str, Any]]):
+    for job in jobs:
+        fan_out_job(job)
+
+
+def schedule_feed_refresh(user_id: str):
+    run_in_background(feed_executor, recompute_feed, user_id)
+
+
+# ---------------------------------------------------------------------------
+# Leaderboards: in-memory ranked boards with Mongo snapshots.
+# ---------------------------------------------------------------------------
+
+LEADERBOARD_BOARDS = ("xp", "rating")
+LEADERBOARD_WINDOWS = ("day", "week", "month")
+LEADERBOARD_MAX_LIMIT = 100
+LEADERBOARD_SNAPSHOT_SIZE = int(os.getenv("LEADERBOARD_SNAPSHOT_SIZE", "100"))
+LEADERBOARD_SNAPSHOT_INTERVAL = float(os.getenv("LEADERBOARD_SNAPSHOT_INTERVAL", "300"))
+LEADERBOARD_WINDOW_TTL = float(os.getenv("LEADERBOARD_WINDOW_TTL", "300"))
+
+
+class _SkipNode:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next: List[Optional["_SkipNode"]] = [None] * level
+        self.width = [1] * level
+
+
+class RankedBoard:
+    """Scores kept in an indexable skip list ordered by (-score, member).
+
+    Every link also stores how many entries it skips, so an update, a rank
+    and a seek to an offset are all O(log n) expected. Ties share the
+    competition rank (1, 2, 2, 4).
+    """
+
+    MAX_LEVEL = 24
+
+    def __init__(self):
+        self._scores: Dict[str, float] = {}
+        self._head = _SkipNode(None, self.MAX_LEVEL)
+
+    def __len__(self):
+        return len(self._scores)
+
+    def _path(self, key) -> Tuple[List[_SkipNode], List[int]]:
+        """Last node before `key` on every level, and its position (head = 0)."""
+        node, position = self._head, 0
+        path, positions = [self._head] * self.MAX_LEVEL, [0] * self.MAX_LEVEL
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            path[level], positions[level] = node, position
+        return path, positions
+
+    def _height(self) -> int:
+        # One more level per trailing zero bit: P(height > h) = 2 ** -h.
+        bits = random.getrandbits(self.MAX_LEVEL - 1) | 1 << (self.MAX_LEVEL - 1)
+        return (bits & -bits).bit_length()
+
+    def _insert(self, key):
+        path, positions = self._path(key)
+        height = self._height()
+        node = _SkipNode(key, height)
+        for level in range(self.MAX_LEVEL):
+            before = path[level]
+            if level < height:
+                skipped = positions[0] - positions[level]
+                node.next[level] = before.next[level]
+                node.width[level] = before.width[level] - skipped
+                before.next[level] = node
+                before.width[level] = skipped + 1
+            else:
+                before.width[level] += 1
+
+    def _remove(self, key):
+        path, _ = self._path(key)
+        node = path[0].next[0]
+        for level in range(self.MAX_LEVEL):
+            before = path[level]
+            if level < len(node.next):
+                before.width[level] += node.width[level] - 1
+                before.next[level] = node.next[level]
+            else:
+                before.width[level] -= 1
+
+    def _count_before(self, key) -> int:
+        node, position = self._head, 0
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def _seek(self, offset: int) -> Optional[_SkipNode]:
+        node, position = self._head, 0
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and position + node.width[level] <= offset + 1:
+                position += node.width[level]
+                node = node.next[level]
+        return node if position == offset + 1 else None
+
+    def load(self, scores: Dict[str, float]):
+        """Replace the board with `scores` in one sorted pass."""
+        self._scores = dict(scores)
+        self._head = _SkipNode(None, self.MAX_LEVEL)
+        last, last_position = [self._head] * self.MAX_LEVEL, [0] * self.MAX_LEVEL
+        for position, key in enumerate(sorted((-score, member) for member, score in self._scores.items()), 1):
+            node = _SkipNode(key, self._height())
+            for level in range(len(node.next)):
+                last[level].next[level] = node
+                last[level].width[level] = position - last_position[level]
+                last[level], last_position[level] = node, position
+        for level in range(self.MAX_LEVEL):
+            last[level].width[level] = len(self._scores) + 1 - last_position[level]
+
+    def set(self, member: str, score: Optional[float]):
+        old = self._scores.get(member)
+        if old == score:
+            return
+        if old is not None:
+            del self._scores[member]
+            self._remove((-old, member))
+        if score is not None:
+            self._scores[member] = score
+            self._insert((-score, member))
+
+    def add(self, member: str, delta: float):
+        self.set(member, self._scores.get(member, 0) + delta)
+
+    def score(self, member: str) -> Optional[float]:
+        return self._scores.get(member)
+
+    def rank(self, member: str) -> Optional[int]:
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        return self._count_before((-score,)) + 1
+
+    def top(self, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+        entries = []
+        node = self._seek(offset) if limit > 0 else None
+        while node is not None and len(entries) < limit:
+            negated, member = node.key
+            entries.append({"rank": self._count_before((negated,)) + 1, "user_id": member, "score": -negated})
+            node = node.next[0]
+        return entries
+
+
+def window_start(window: str, now: Optional[datetime] = None) -> datetime:
+    day = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == "week":
+        return day - timedelta(days=day.weekday())
+    if window == "month":
+        return day.replace(day=1)
+    return day
+
+
+def parse_rating(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        rating = float(value.to_decimal() if isinstance(value, Decimal128) else value)
+    except (TypeError, ValueError, decimal.InvalidOperation):
+        return None
+    return rating if math.isfinite(rating) else None
+
+
+class Leaderboard:
+    """XP and rating boards keyed by user id, overall and per freelancer category.
+
+    Board names are "xp", "rating", "xp:<category>" and "rating:<category>".
+    Windowed XP boards ("day", "week", "month") are aggregated from xp_events,
+    kept live by record_xp() and rebuilt after LEADERBOARD_WINDOW_TTL or when
+    the period rolls over.
+    """
+
+    FREELANCER_PROJECTION = {"user_id": 1, "rating": 1, "categories": 1}
+
+    def __init__(self):
+        self.ready = False
+        self._lock = threading.RLock()
+        self._pending: Optional[List[Tuple[str, Any]]] = None
+        self._boards: Dict[str, RankedBoard] = {}
+        self._categories: Dict[str, Tuple[str, ...]] = {}
+        self._freelancers: set = set()
+        self._windows: Dict[str, Tuple[datetime, float, Dict[str, RankedBoard]]] = {}
+
+    @staticmethod
+    def board_name(by: str, category: Optional[str] = None) -> str:
+        return f"{by}:{category.casefold()}" if category else by
+
+    def _board(self, boards: Dict[str, RankedBoard], name: str) -> RankedBoard:
+        board = boards.get(name)
+        if board is None:
+            board = boards[name] = RankedBoard()
+        return board
+
+    def _set(self, by: str, user_id: str, score: Optional[float], categories: Tuple[str, ...]):
+        self._board(self._boards, by).set(user_id, score)
+        for category in categories:
+            self._board(self._boards, self.board_name(by, category)).set(user_id, score)
+
+    def _apply(self, kind: str, payload: Any):
+        if kind == "xp":
+            user_id, xp = payload
+            self._set("xp", user_id, xp, self._categories.get(user_id, ()))
+            return
+        user_id = payload.get("user_id")
+        if not user_id:
+            return
+        user_id = str(user_id)
+        self._freelancers.add(user_id)
+        categories = tuple(sorted({str(category).casefold() for category in payload.get("categories") or [] if category}))
+        old = self._categories.get(user_id, ())
+        for category in set(old) - set(categories):
+            for by in LEADERBOARD_BOARDS:
+                self._board(self._boards, self.board_name(by, category)).set(user_id, None)
+        if categories:
+            self._categories[user_id] = categories
+        else:
+            self._categories.pop(user_id, None)
+        self._set("rating", user_id, parse_rating(payload.get("rating")), categories)
+        # A freelancer is on the XP boards from the start, at 0 until the first grant.
+        xp = self._board(self._boards, "xp").score(user_id)
+        self._set("xp", user_id, 0 if xp is None else xp, categories)
+
+    def _record(self, kind: str, payload: Any):
+        with self._lock:
+            self._apply(kind, payload)
+            if self._pending is not None:
+                self._pending.append((kind, payload))
+
+    def record_xp(self, user_id: str, xp: int, delta: int = 0):
+        """New XP total for a user; `delta` also goes to the live window boards."""
+        with self._lock:
+            self._record("xp", (user_id, xp))
+            if delta:
+                categories = self._categories.get(user_id, ())
+                for _, _, boards in self._windows.values():
+                    self._board(boards, "xp").add(user_id, delta)
+                    for category in categories:
+                        self._board(boards, self.board_name("xp", category)).add(user_id, delta)
+
+    def update_freelancer(self, doc: Dict[str, Any]):
+        self._record("freelancer", doc)
+
+    def rebuild(self, users, freelancers):
+        """Replace every board from the users and freelancers cursors."""
+        with self._lock:
+            self._pending = []
+        fresh = Leaderboard()
+        for doc in freelancers:
+            fresh._apply("freelancer", doc)
+        for doc in users:
+            fresh._apply("xp", (str(doc["_id"]), doc.get("xp", 0)))
+        with self._lock:
+            for kind, payload in self._pending:
+                fresh._apply(kind, payload)
+            self._pending = None
+            self._boards = fresh._boards
+            self._categories = fresh._categories
+            self._freelancers = fresh._freelancers
+            self.ready = True
+
+    def _window_boards(self, window: str) -> Dict[str, RankedBoard]:
+        start = window_start(window)
+        with self._lock:
+            cached = self._windows.get(window)
+            if cached and cached[0] == start and time.monotonic() - cached[1] < LEADERBOARD_WINDOW_TTL:
+                return cached[2]
+            categories = dict(self._categories)
+            freelancers = set(self._freelancers)
+        scores: Dict[str, Dict[str, float]] = {}
+
+        def put(user_id: str, xp: float):
+            scores.setdefault("xp", {})[user_id] = xp
+            for category in categories.get(user_id, ()):
+                scores.setdefault(self.board_name("xp", category), {})[user_id] = xp
+
+        # Every freelancer is ranked, with 0 if they earned nothing this window.
+        for user_id in freelancers:
+            put(user_id, 0)
+        rows = db.xp_events.aggregate([
+            {"$match": {"at": {"$gte": start}}},
+            {"$group": {"_id": "$user_id", "xp": {"$sum": "$delta"}}},
+        ])
+        for row in rows:
+            put(row["_id"], row["xp"])
+        boards: Dict[str, RankedBoard] = {}
+        for name, entries in scores.items():
+            self._board(boards, name).load(entries)
+        with self._lock:
+            self._windows[window] = (start, time.monotonic(), boards)
+        return boards
+
+    def _lookup(self, by: str, category: Optional[str], window: Optional[str]) -> Optional[RankedBoard]:
+        name = self.board_name(by, category)
+        if window:
+            return self._window_boards(window).get(name)
+        return self._boards.get(name)
+
+    def top(self, by: str, category: Optional[str], window: Optional[str], limit: int, offset: int = 0):
+        board = self._lookup(by, category, window)
+        with self._lock:
+            return (board.top(limit, offset), len(board)) if board else ([], 0)
+
+    def rank(self, by: str, category: Optional[str], window: Optional[str], user_id: str):
+        board = self._lookup(by, category, window)
+        with self._lock:
+            if not board or board.rank(user_id) is None:
+                return None
+            return {"rank": board.rank(user_id), "score": board.score(user_id), "total": len(board)}
+
+    def snapshot(self):
+        """Store the top entries of every board in leaderboard_snapshots."""
+        with self._lock:
+            if not self.ready:
+                return
+            tops = {name: board.top(LEADERBOARD_SNAPSHOT_SIZE) for name, board in self._boards.items()}
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne({"_id": name}, {"$set": {"entries": entries, "total": len(self._boards[name]), "taken_at": now}},
+                      upsert=True)
+            for name, entries in tops.items()
+        ]
+        for start in range(0, len(operations), STREAM_BATCH_SIZE):
+            db.leaderboard_snapshots.bulk_write(operations[start:start + STREAM_BATCH_SIZE], ordered=False)
+
+    def run_snapshots(self):
+        while True:
+            time.sleep(LEADERBOARD_SNAPSHOT_INTERVAL)
+            try:
+                self.snapshot()
+            except PyMongoError as exc:
+                app.logger.warning("leaderboard snapshot failed: %s", exc)
+
+
+leaderboard = Leaderboard()
+
+
+def rebuild_leaderboard():
+    try:
+        leaderboard.rebuild(
+            db.users.find({}, {"xp": 1}).batch_size(STREAM_BATCH_SIZE),
+            db.freelancers.find({}, Leaderboard.FREELANCER_PROJECTION).batch_size(STREAM_BATCH_SIZE),
+        )
+    except PyMongoError as exc:
+        app.logger.warning("leaderboard not built: %s", exc)
+
+
+def log_xp_events(deltas: Dict[str, int]):
+    """Append XP grants to xp_events, the source of the windowed leaderboards."""
+    now = datetime.utcnow()
+    try:
+        db.xp_events.insert_many(
+            [{"user_id": user_id, "delta": delta, "at": now} for user_id, delta in deltas.items()],
+            ordered=False,
+        )
+    except PyMongoError as exc:
+        app.logger.warning("xp events not logged: %s", exc)
+
+
+# ---------------------------------------------------------------------------
+# Review rating aggregates, kept on freelancer documents.
+# ---------------------------------------------------------------------------
+
+RATING_PRIOR_MEAN = float(os.getenv("RATING_PRIOR_MEAN", "3.5"))
+RATING_PRIOR_WEIGHT = float(os.getenv("RATING_PRIOR_WEIGHT", "5"))
+RATING_PROJECTION = {"rating": 1, "rating_count": 1, "rating_sum": 1}
+
+
+def review_stars(value: Any) -> Optional[float]:
+    stars = parse_rating(value)
+    if stars is None or not 1 <= stars <= 5:
+        return None
+    return int(stars) if stars.is_integer() else stars
+
+
+def star_bucket(stars: float) -> str:
+    return str(int(math.floor(stars + 0.5)))
+
+
+def bayesian_rating(count: int, total: float) -> float:
+    """Average pulled towards RATING_PRIOR_MEAN until a freelancer has enough reviews."""
+    if not count:
+        return 0
+    return round((RATING_PRIOR_WEIGHT * RATING_PRIOR_MEAN + total) / (RATING_PRIOR_WEIGHT + count), 3)
+
+
+def rating_pipeline(count: int, total: float, histogram: Dict[str, int]) -> List[Dict[str, Any]]:
+    increments = {
+        "rating_count": {"$add": [{"$ifNull": ["$rating_count", 0]}, count]},
+        "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, total]},
+    }
+    for bucket, n in histogram.items():
+        increments[f"rating_histogram.{bucket}"] = {"$add": [{"$ifNull": [f"$rating_histogram.{bucket}", 0]}, n]}
+    prior = RATING_PRIOR_WEIGHT * RATING_PRIOR_MEAN
+    return [
+        {"$set": increments},
+        {"$set": {
+            "rating": {"$round": [
+                {"$divide": [{"$add": [prior, "$rating_sum"]}, {"$add": [RATING_PRIOR_WEIGHT, "$rating_count"]}]},
+                3,
+            ]},
+            CHANGE_FIELD: "$$CLUSTER_TIME",
+        }},
+    ]
+
+
+def apply_review_ratings(reviews: List[Dict[str, Any]]) -> List[ObjectId]:
+    """Fold new reviews into the freelancers' aggregates; returns the freelancers touched.
+
+    On standalone servers only the $inc half is written here; the caller
+    re-reads the counters and sets `rating` (see reviews_inserted).
+    """
+    deltas: Dict[ObjectId, Dict[str, Any]] = {}
+    for review in reviews:
+        stars = review_stars(review.get("rating"))
+        object_id = parse_object_id(review.get("freelancer_id"))
+        if stars is None or not object_id:
+            continue
+        delta = deltas.setdefault(object_id, {"count": 0, "total": 0, "histogram": {}})
+        delta["count"] += 1
+        delta["total"] += stars
+        bucket = star_bucket(stars)
+        delta["histogram"][bucket] = delta["histogram"].get(bucket, 0) + 1
+    if not deltas:
+        return []
+    if cluster_time_available():
+        operations = [
+            UpdateOne({"_id": object_id}, rating_pipeline(delta["count"], delta["total"], delta["histogram"]))
+            for object_id, delta in deltas.items()
+        ]
+    else:
+        operations = [
+            UpdateOne({"_id": object_id}, stamp_update({"$inc": {
+                "rating_count": delta["count"],
+                "rating_sum": delta["total"],
+                **{f"rating_histogram.{bucket}": n for bucket, n in delta["histogram"].items()},
+            }}))
+            for object_id, delta in deltas.items()
+        ]
+    db.freelancers.bulk_write(operations, ordered=False)
+    return list(deltas)
+
+
+def stale_rating(doc: Dict[str, Any]) -> Optional[float]:
+    score = bayesian_rating(doc.get("rating_count", 0), doc.get("rating_sum", 0))
+    return None if doc.get("rating") == score else score
+
+
+# ---------------------------------------------------------------------------
+# Read-through caches.
+# ---------------------------------------------------------------------------
+
+class MemoryCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisCache:
+    """Shared cache for multi-process deployments (needs the redis package)."""
+
+    def __init__(self, url: str, ttl: float = 30.0, prefix: str = "freelancekz:"):
+        import redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Any:
+        raw = self._client.get(self.prefix + key)
+        return json_util.loads(raw) if raw else None
+
+    def set(self, key: str, value: Any):
+        self._client.set(self.prefix + key, json_util.dumps(value), ex=max(1, int(self.ttl)))
+
+    def delete(self, key: str):
+        self._client.delete(self.prefix + key)
+
+
+class NullCache:
+    def get(self, key: str) -> Any:
+        return None
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def delete(self, key: str):
+        pass
+
+
+def make_cache(ttl: float, maxsize: int = 10000):
+    """Build the backend selected by CACHE_BACKEND: memory (default), redis or none."""
+    backend = os.getenv("CACHE_BACKEND", "memory").lower()
+    if backend == "none":
+        return NullCache()
+    if backend == "redis":
+        return RedisCache(os.getenv("REDIS_URL", "redis://localhost:6379/0"), ttl)
+    return MemoryCache(maxsize, ttl)
+
+
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "30"))
+profile_cache = make_cache(PROFILE_CACHE_TTL, int(os.getenv("PROFILE_CACHE_SIZE", "10000")))
+
+
+def load_profile(user_id: str, object_id: ObjectId) -> Optional[Dict[str, Any]]:
+    """{"user", "freelancer"} for a user, read through profile_cache.
+
+    The cached payload is shared between requests and must not be mutated.
+    """
+    key = f"profile:{user_id}"
+    payload = profile_cache.get(key)
+    if payload is not None:
+        return payload
+    user = next(db.users.aggregate([
+        {"$match": {"_id": object_id}},
+        {"$limit": 1},
+        {"$project": USER_PROJECTION},
+        {"$lookup": {
+            "from": "freelancers",
+            "pipeline": [{"$match": {"user_id": user_id}}, {"$limit": 1}],
+            "as": "freelancer",
+        }},
+    ]), None)
+    if not user:
+        return None
+    freelancer = (user.pop("freelancer") or [None])[0]
+    if "xp" not in user:
+        db.users.update_one(
+            {"_id": object_id},
+            stamp_update({"$set": {"xp": 0, "level": "novice", "professionalism": 0}})
+        )
+        user["xp"] = 0
+        user["level"] = "novice"
+        user["professionalism"] = 0
+    payload = {
+        "user": attach_masked_iin(serialize(user)),
+        "freelancer": serialize(freelancer),
+    }
+    profile_cache.set(key, payload)
+    return payload
+
+
+def invalidate_profile(user_id: Optional[str]):
+    if user_id:
+        profile_cache.delete(f"profile:{user_id}")
+
+
+# ---------------------------------------------------------------------------
+# Outbox for the users -> freelancers mirror.
+#
+# Routes record which parts of a user's freelancer profile are stale; the
+# worker recomputes those parts from users/education/experience and writes
+# them with one bulk_write per batch. Applying an event twice is harmless,
+# so a crash between the mirror write and the outbox delete just replays it.
+# ---------------------------------------------------------------------------
+
+MIRROR_PROFILE_FIELDS = ("phone", "title", "bio", "location", "hourly_rate", "languages", "categories")
+MIRROR_LEVEL_FIELDS = ("level", "professionalism")
+MIRROR_HISTORY = ("education", "experience")
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+
+
+def mirror_change(user_id: str, *parts: str, write: Callable[[Any], Any], refresh_feed: bool = False):
+    """Run `write(session)`, a user write that makes parts of the freelancer mirror stale.
+
+    On replica sets the outbox event commits in the same transaction, and
+    with_transaction() re-runs both on TransientTransactionError (e.g. a
+    write conflict with a concurrent grant) or an unknown commit result, so
+    `write` must be safe to call again. Elsewhere the event is written right
+    after the primary write. Returns what `write` returned.
+    """
+    # Transactions need a replica set or mongos, same as $$CLUSTER_TIME.
+    if cluster_time_available():
+        def in_transaction(session):
+            result = write(session)
+            db.outbox.insert_one({
+                "user_id": user_id,
+                "parts": list(parts),
+                "refresh_feed": refresh_feed,
+                "created_at": datetime.utcnow(),
+            }, session=session)
+            return result
+
+        with client.start_session() as session:
+            result = session.with_transaction(in_transaction)
+        outbox_worker.wake()
+        return result
+    result = write(None)
+    record_mirror_change(user_id, *parts, refresh_feed=refresh_feed)
+    return result
+
+
+def record_mirror_change(user_id: str, *parts: str, refresh_feed: bool = False):
+    """Outbox event for a write that has already happened outside mirror_change()."""
+    db.outbox.insert_one({
+        "user_id": user_id,
+        "parts": list(parts),
+        "refresh_feed": refresh_feed,
+        "created_at": datetime.utcnow(),
+    })
+    outbox_worker.wake()
+
+
+def apply_mirror_updates(plan: Dict[str, Dict[str, Any]]):
+    """Recompute the stale mirror parts for each user in `plan` ({user_id: {"parts", "refresh_feed"}})."""
+    object_ids = [object_id for object_id in (parse_object_id(user_id) for user_id in plan) if object_id]
+    projection = {field: 1 for field in MIRROR_PROFILE_FIELDS + MIRROR_LEVEL_FIELDS}
+    users = {str(user["_id"]): user for user in db.users.find({"_id": {"$in": object_ids}}, projection)}
+    history: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for name in MIRROR_HISTORY:
+        user_ids = [user_id for user_id, item in plan.items() if name in item["parts"]]
+        if not user_ids:
+            continue
+        entries = db[name].find({"user_id": {"$in": user_ids}}, {"_id": 0, CHANGE_FIELD: 0}) \
+            .sort([("created_at", ASCENDING), ("_id", ASCENDING)])
+        for entry in entries:
+            history.setdefault((entry.pop("user_id"), name), []).append(entry)
+
+    now = datetime.utcnow()
+    operations = []
+    for user_id, item in plan.items():
+        user = users.get(user_id)
+        if user is None:
+            continue
+        fields = {}
+        if "profile" in item["parts"]:
+            fields.update({field: user[field] for field in MIRROR_PROFILE_FIELDS if field in user})
+        if "level" in item["parts"]:
+            fields.update({field: user[field] for field in MIRROR_LEVEL_FIELDS if field in user})
+        for name in MIRROR_HISTORY:
+            if name in item["parts"]:
+                fields[name] = history.get((user_id, name), [])
+        if fields:
+            fields["updated_at"] = now
+            operations.append(UpdateOne({"user_id": user_id}, stamp_update({"$set": fields})))
+    for start in range(0, len(operations), STREAM_BATCH_SIZE):
+        db.freelancers.bulk_write(operations[start:start + STREAM_BATCH_SIZE], ordered=False)
+
+    projection = {**FreelancerMatcher.PROJECTION, **Leaderboard.FREELANCER_PROJECTION}
+    for freelancer in db.freelancers.find({"user_id": {"$in": list(users)}}, projection):
+        freelancer_matcher.upsert(freelancer)
+        leaderboard.update_freelancer(freelancer)
+    for user_id, item in plan.items():
+        invalidate_profile(user_id)
+        if item["refresh_feed"]:
+            schedule_feed_refresh(user_id)
+
+
+class OutboxWorker:
+    """Drains db.outbox in batches, coalescing events per user."""
+
+    def __init__(self, batch_size: int = 500, poll_interval: float = 1.0):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.drained = 0
+        self.applied_users = 0
+        self.errors = 0
+        self.last_drain_at: Optional[datetime] = None
+        self.last_drain_seconds = 0.0
+
+    def wake(self):
+        self._wake.set()
+
+    def drain(self) -> int:
+        """Apply one batch of events; returns how many events were consumed."""
+        events = list(db.outbox.find({}).sort("_id", ASCENDING).limit(self.batch_size))
+        if not events:
+            return 0
+        started = time.monotonic()
+        plan: Dict[str, Dict[str, Any]] = {}
+        for event in events:
+            item = plan.setdefault(event["user_id"], {"parts": set(), "refresh_feed": False})
+            item["parts"].update(event.get("parts") or [])
+            item["refresh_feed"] = item["refresh_feed"] or bool(event.get("refresh_feed"))
+        apply_mirror_updates(plan)
+        db.outbox.delete_many({"_id": {"$in": [event["_id"] for event in events]}})
+        with self._lock:
+            self.drained += len(events)
+            self.applied_users += len(plan)
+            self.last_drain_at = datetime.utcnow()
+            self.last_drain_seconds = round(time.monotonic() - started, 3)
+        return len(events)
+
+    def run(self):
+        while True:
+            try:
+                if self.drain() >= self.batch_size:
+                    continue
+            except PyMongoError as exc:
+                with self._lock:
+                    self.errors += 1
+                app.logger.warning("outbox drain failed: %s", exc)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        oldest = db.outbox.find_one({}, {"created_at": 1}, sort=[("_id", ASCENDING)])
+        lag = (datetime.utcnow() - oldest["created_at"]).total_seconds() if oldest else 0.0
+        with self._lock:
+            return {
+                "pending": db.outbox.estimated_document_count(),
+                "lag_seconds": round(max(lag, 0.0), 3),
+                "drained": self.drained,
+                "applied_users": self.applied_users,
+                "errors": self.errors,
+                "last_drain_at": self.last_drain_at,
+                "last_drain_seconds": self.last_drain_seconds,
+            }
+
+
+outbox_worker = OutboxWorker(OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL)
+
+
+# ---------------------------------------------------------------------------
+# Admission control: per route class concurrency limits and token buckets.
+# ---------------------------------------------------------------------------
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_CONTROL", "1").lower() in {"1", "true", "yes"}
+ADMISSION_ROUTES = {
+    "register": "auth",
+    "login": "auth",
+    "egov_callback": "auth",
+    "egov_register": "auth",
+    "egov_verify": "auth",
+    "list_jobs": "list",
+    "list_freelancers": "list",
+    "list_clients": "list",
+    "list_reviews": "list",
+    "list_projects": "list",
+    "list_messages": "list",
+    "get_job_matches": "list",
+    "sync_collection": "list",
+    "batch_get_users": "bulk",
+    "batch_get_freelancers": "bulk",
+    "batch_get_jobs": "bulk",
+    "bulk_create": "bulk",
+}
+# class -> (concurrent requests, queued requests, queue wait seconds, requests/second per client address, burst)
+# Each value can be overridden with ADMISSION_<CLASS>_<CONCURRENCY|QUEUE|QUEUE_TIMEOUT|RATE|BURST>;
+# 0 disables that limit.
+ADMISSION_DEFAULTS = {
+    "auth": (max(4, PASSWORD_WORKERS * 2), 32, 2.0, 1.0, 10),
+    "list": (32, 64, 1.0, 20.0, 40),
+    "bulk": (4, 8, 5.0, 1.0, 5),
+}
+
+
+class TokenBuckets:
+    """In-process token buckets, least recently used keys evicted past `maxsize`."""
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """Spend one token; returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisTokenBuckets:
+    """Token buckets shared by every process (needs the redis package)."""
+
+    SCRIPT = """
+    local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str, prefix: str = "freelancekz:rate:"):
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self.SCRIPT)
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        try:
+            return float(self._take(keys=[self.prefix + key], args=[rate, burst, time.time()]))
+        except Exception as exc:
+            # Fail open: losing the limiter must not take the API down with it.
+            app.logger.warning("rate limiter unavailable: %s", exc)
+            return 0.0
+
+
+class RouteClass:
+    """Concurrency limit with a short bounded wait queue for one class of routes."""
+
+    def __init__(self, name: str, concurrency: int, queue: int, queue_timeout: float, rate: float, burst: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.queue_timeout = queue_timeout
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected_rate = 0
+        self.rejected_busy = 0
+
+    def enter(self) -> bool:
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.queued >= self.queue:
+                    self.rejected_busy += 1
+                    return False
+                self.queued += 1
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+            with self._lock:
+                self.queued -= 1
+                if not acquired:
+                    self.rejected_busy += 1
+                    return False
+        with self._lock:
+            self.in_flight += 1
+            self.admitted += 1
+        return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def rate_limited(self):
+        with self._lock:
+            self.rejected_rate += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "admitted": self.admitted,
+                "rejected_rate": self.rejected_rate,
+                "rejected_busy": self.rejected_busy,
+            }
+
+
+def make_route_class(name: str, defaults: Tuple[int, int, float, float, float]) -> RouteClass:
+    fields = ("CONCURRENCY", "QUEUE", "QUEUE_TIMEOUT", "RATE", "BURST")
+    values = [float(os.getenv(f"ADMISSION_{name.upper()}_{field}", default)) for field, default in zip(fields, defaults)]
+    concurrency, queue, queue_timeout, rate, burst = values
+    return RouteClass(name, int(concurrency), int(queue), queue_timeout, rate, burst)
+
+
+route_classes = {name: make_route_class(name, defaults) for name, defaults in ADMISSION_DEFAULTS.items()}
+if os.getenv("ADMISSION_BACKEND", "memory").lower() == "redis":
+    rate_buckets = RedisTokenBuckets(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+else:
+    rate_buckets = TokenBuckets()
+
+
+@app.before_request
+def admit_request():
+    if not ADMISSION_ENABLED or request.method == "OPTIONS":
+        return None
+    route_class = route_classes.get(ADMISSION_ROUTES.get(request.endpoint))
+    if route_class is None:
+        return None
+    # X-User-Id is not authenticated, so a client could rotate it to get a
+    # fresh bucket per request: buckets are per address. Behind a proxy,
+    # remote_addr is only the client if ProxyFix is configured.
+    client_key = request.remote_addr or "unknown"
+    if route_class.rate > 0:
+        wait = rate_buckets.take(f"{route_class.name}:{client_key}", route_class.rate, route_class.burst)
+        if wait > 0:
+            route_class.rate_limited()
+            return busy_response("rate limit exceeded", 429, wait)
+    if not route_class.enter():
+        return busy_response("server busy, retry later", 503)
+    g.admitted_class = route_class
+    return None
+
+
+@app.after_request
+def hold_admission_while_streaming(response):
+    # Streamed bodies (NDJSON exports) run after the view returns; keep the
+    # slot until the server has sent them or the client went away.
+    if response.is_streamed and "admitted_class" in g:
+        response.call_on_close(g.pop("admitted_class").leave)
+    return response
+
+
+@app.teardown_request
+def release_admission(_exc):
+    route_class = g.pop("admitted_class", None)
+    if route_class is not None:
+        route_class.leave()
 
 
 ensure_test_admin()
 
+if os.getenv("AUTO_CREATE_INDEXES", "1").lower() in {"1", "true", "yes"}:
+    try:
+        for name, error in ensure_indexes()["errors"].items():
+            # e.g. duplicate emails leave email_unique missing, and with it the
+            # guarantee register/egov_register rely on.
+            app.logger.error("index %s not created: %s", name, error)
+    except PyMongoError as exc:
+        app.logger.warning("index bootstrap skipped: %s", exc)
+
+if os.getenv("JOB_SEARCH_INDEX", "1").lower() in {"1", "true", "yes"}:
+    # Built in the background; list_jobs keeps using $regex until it is ready.
+    threading.Thread(target=rebuild_job_search, name="job-search-rebuild", daemon=True).start()
+
+threading.Thread(target=rebuild_skill_index, name="skill-index-rebuild", daemon=True).start()
+threading.Thread(target=rebuild_freelancer_matcher, name="matcher-rebuild", daemon=True).start()
+threading.Thread(target=rebuild_leaderboard, name="leaderboard-rebuild", daemon=True).start()
+threading.Thread(target=leaderboard.run_snapshots, name="leaderboard-snapshot", daemon=True).start()
+threading.Thread(target=outbox_worker.run, name="outbox-worker", daemon=True).start()
+if xp_buffer is not None:
+    threading.Thread(target=xp_buffer.run, name="xp-flush", daemon=True).start()
+
 
 @app.get("/api/health")
 def health():
-    return jsonify({"status": "ok", "timestamp": datetime.utcnow().isoformat()})
+    return jsonify({"status": "ok", "timestamp": datetime.utcnow()})
+
+
+@app.get("/api/metrics")
+def metrics():
+    return jsonify({
+        "xp_buffer": xp_buffer.stats() if xp_buffer is not None else None,
+        "outbox": outbox_worker.stats(),
+        "passwords": password_hasher.stats(),
+        "admission": {name: route_class.stats() for name, route_class in route_classes.items()},
+        "egov": egov_client.stats(),
+    })
+
+
+def new_freelancer_profile(user_id: str) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    return {
+        "user_id": user_id,
+        "title": "",
+        "bio": "",
+        "skills": [],
+        "hourly_rate": None,
+        "location": "",
+        "languages": [],
+        "categories": [],
+        "education": [],
+        "experience": [],
+        "certifications": [],
+        "completed_projects": 0,
+        "rating": 0,
+        "professionalism": 0,
+        "level": "novice",
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+def duplicate_key_field(exc: DuplicateKeyError) -> Optional[str]:
+    """The first field of the unique index a DuplicateKeyError was raised on."""
+    key_pattern = (exc.details or {}).get("keyPattern")
+    if key_pattern:
+        return next(iter(key_pattern))
+    message = (exc.details or {}).get("errmsg") or str(exc)
+    for field in ("iin_hash", "email"):
+        if f"{field}_unique" in message:
+            return field
+    return None
 
 
 @app.post("/api/auth/register")
@@ -197,12 +3051,17 @@ def register():
     if db.users.find_one({"email": email}):
         return jsonify({"error": "email already registered"}), 409
 
+    try:
+        hashed_password = password_hasher.hash(password)
+    except PasswordHasherBusy as exc:
+        return busy_response(exc)
+
     iin_encrypted = encrypt_iin(iin) if iin else None
     iin_hash = hash_iin(iin) if iin else None
 
     user = {
         "email": email,
-        "password": bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8'),
+        "password": hashed_password,
         "fullName": full_name,
         "phone": phone,
         "role": role,
@@ -214,29 +3073,19 @@ def register():
         "egov_auth": False,
         "created_at": datetime.utcnow()
     }
-    result = db.users.insert_one(user)
+    try:
+        result = db.users.insert_one(stamp_insert(user))
+    except DuplicateKeyError as exc:
+        # The find_one above is only a fast path; the unique indexes decide.
+        if duplicate_key_field(exc) == "iin_hash":
+            return jsonify({"error": "iin already registered"}), 409
+        return jsonify({"error": "email already registered"}), 409
     user_id = str(result.inserted_id)
 
     if role in ["freelancer", "both"]:
-        freelancer_profile = {
-            "user_id": user_id,
-            "title": "",
-            "bio": "",
-            "skills": [],
-            "hourly_rate": None,
-            "location": "",
-            "languages": [],
-            "education": [],
-            "experience": [],
-            "certifications": [],
-            "completed_projects": 0,
-            "rating": 0,
-            "professionalism": 0,
-            "level": "novice",
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        db.freelancers.insert_one(freelancer_profile)
+        freelancer_profile = new_freelancer_profile(user_id)
+        db.freelancers.insert_one(stamp_insert(freelancer_profile))
+        freelancer_matcher.upsert(freelancer_profile)
     return jsonify({"user_id": user_id, "role": role}), 201
 
 
@@ -247,8 +3096,17 @@ def login():
     password = payload.get("password")
 
     user = db.users.find_one({"email": email})
-    if not user or not bcrypt.checkpw(password.encode('utf-8'), user["password"].encode('utf-8')):
+    # eGov-only accounts have no password and can only sign in through eGov.
+    if not user or not user.get("password") or not password:
+        return jsonify({"error": "invalid credentials"}), 401
+    try:
+        valid = password_hasher.check(password, user["password"])
+    except PasswordHasherBusy as exc:
+        return busy_response(exc)
+    if not valid:
         return jsonify({"error": "invalid credentials"}), 401
+    if password_hasher.needs_rehash(user["password"]):
+        password_hasher.rehash_later(user["_id"], password, user["password"])
 
     try:
         add_xp(str(user["_id"]), 1)
@@ -277,11 +3135,219 @@ def add_xp_endpoint():
         return jsonify({"error": "invalid user id"}), 400
 
 
+def leaderboard_args() -> Tuple[str, Optional[str], Optional[str]]:
+    by = request.args.get("by", "xp")
+    if by not in LEADERBOARD_BOARDS:
+        raise ValueError(f"by must be one of: {', '.join(LEADERBOARD_BOARDS)}")
+    window = request.args.get("window") or None
+    if window and window not in LEADERBOARD_WINDOWS:
+        raise ValueError(f"window must be one of: {', '.join(LEADERBOARD_WINDOWS)}")
+    if window and by != "xp":
+        raise ValueError("windows are only available for by=xp")
+    return by, request.args.get("category") or None, window
+
+
+@app.get("/api/leaderboard")
+def get_leaderboard():
+    try:
+        by, category, window = leaderboard_args()
+        limit = max(1, min(int(request.args.get("limit", 50)), LEADERBOARD_MAX_LIMIT))
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    result = {"by": by, "category": category, "window": window}
+    if window or leaderboard.ready:
+        items, total = leaderboard.top(by, category, window, limit, offset)
+    else:
+        # Still rebuilding after startup: serve the last snapshot.
+        snapshot = db.leaderboard_snapshots.find_one({"_id": Leaderboard.board_name(by, category)}) or {}
+        items = snapshot.get("entries", [])[offset:offset + limit]
+        total = snapshot.get("total", 0)
+        result["snapshot_at"] = snapshot.get("taken_at")
+    object_ids = [object_id for object_id in (parse_object_id(item["user_id"]) for item in items) if object_id]
+    users = {str(user["_id"]): user for user in db.users.find({"_id": {"$in": object_ids}}, {"fullName": 1, "level": 1})}
+    for item in items:
+        user = users.get(item["user_id"], {})
+        item["fullName"] = user.get("fullName")
+        item["level"] = user.get("level")
+    result.update({"total": total, "items": items})
+    return jsonify(result)
+
+
+@app.get("/api/leaderboard/rank/<user_id>")
+def get_leaderboard_rank(user_id):
+    try:
+        by, category, window = leaderboard_args()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if not window and not leaderboard.ready:
+        return jsonify({"error": "leaderboard is still loading"}), 503
+    ranked = leaderboard.rank(by, category, window, user_id)
+    if ranked is None:
+        return jsonify({"error": "user is not on this leaderboard"}), 404
+    return jsonify({"by": by, "category": category, "window": window, "user_id": user_id, **ranked})
+
+
 # eGov OAuth Configuration
 EGOV_CLIENT_ID = os.getenv("EGOV_CLIENT_ID", "freelancekz-app")
 EGOV_CLIENT_SECRET = os.getenv("EGOV_CLIENT_SECRET", "")
 EGOV_REDIRECT_URI = os.getenv("EGOV_REDIRECT_URI", "http://localhost:8080/auth/egov/callback")
-EGOV_BASE_URL = "https://idp.egov.kz"
+# Point at Backend/egov_stub.py to run the OAuth flow offline.
+EGOV_BASE_URL = os.getenv("EGOV_BASE_URL", "https://idp.egov.kz").rstrip("/")
+EGOV_CONNECT_TIMEOUT = float(os.getenv("EGOV_CONNECT_TIMEOUT", "3"))
+EGOV_READ_TIMEOUT = float(os.getenv("EGOV_READ_TIMEOUT", "10"))
+EGOV_RETRIES = int(os.getenv("EGOV_RETRIES", "2"))
+EGOV_POOL_SIZE = int(os.getenv("EGOV_POOL_SIZE", "20"))
+EGOV_BREAKER_THRESHOLD = int(os.getenv("EGOV_BREAKER_THRESHOLD", "5"))
+EGOV_BREAKER_RESET = float(os.getenv("EGOV_BREAKER_RESET", "30"))
+EGOV_USERINFO_TTL = float(os.getenv("EGOV_USERINFO_TTL", "60"))
+
+
+class EgovUnavailable(Exception):
+    """eGov is unreachable, failing, or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; lets one trial call through after `reset_timeout`."""
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(1.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                if self._opened_at is None or self._trial:
+                    self.opened += 1
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+class EgovClient:
+    """HTTP client for the eGov IdP.
+
+    It uses a pooled keep-alive session with connect/read timeouts. Connect
+    errors are retried with backoff; GETs are also retried on 502-504.
+    Network errors and 5xx responses count towards the circuit breaker.
+    userinfo responses are cached per access token for a short TTL.
+    """
+
+    def __init__(self, base_url: str):
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.base_url = base_url
+        self.timeout = (EGOV_CONNECT_TIMEOUT, EGOV_READ_TIMEOUT)
+        self.breaker = CircuitBreaker(EGOV_BREAKER_THRESHOLD, EGOV_BREAKER_RESET)
+        self.session = requests.Session()
+        retries = Retry(
+            total=EGOV_RETRIES,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            # The authorization code is single-use: POSTs are only retried
+            # when the connection was never made.
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=EGOV_POOL_SIZE, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._userinfo = MemoryCache(maxsize=10000, ttl=EGOV_USERINFO_TTL)
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.userinfo_hits = 0
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise EgovUnavailable("eGov is temporarily unavailable")
+        self.calls += 1
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as exc:
+            self.errors += 1
+            self.breaker.failure()
+            raise EgovUnavailable(f"eGov request failed: {exc.__class__.__name__}") from exc
+        if response.status_code >= 500:
+            self.errors += 1
+            self.breaker.failure()
+            raise EgovUnavailable(f"eGov returned {response.status_code}")
+        self.breaker.success()
+        return response
+
+    def exchange_code(self, code: str) -> requests.Response:
+        data = {
+            "grant_type": "authorization_code",
+            "code": code,
+            "client_id": EGOV_CLIENT_ID,
+            "redirect_uri": EGOV_REDIRECT_URI,
+        }
+        if EGOV_CLIENT_SECRET:
+            data["client_secret"] = EGOV_CLIENT_SECRET
+        return self._request("POST", "/oauth2/token", data=data)
+
+    def userinfo(self, access_token: str) -> Optional[Dict[str, Any]]:
+        """Claims for an access token, or None if eGov rejected it."""
+        key = hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+        cached = self._userinfo.get(key)
+        if cached is not None:
+            self.userinfo_hits += 1
+            return cached
+        response = self._request("GET", "/oauth2/userinfo", headers={"Authorization": f"Bearer {access_token}"})
+        if not response.ok:
+            return None
+        info = response.json()
+        self._userinfo.set(key, info)
+        return info
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+            "calls": self.calls,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "userinfo_cache_hits": self.userinfo_hits,
+        }
+
+
+egov_client = EgovClient(EGOV_BASE_URL)
 
 
 @app.route("/api/auth/egov/authorize")
@@ -314,39 +3380,22 @@ def egov_callback():
 
     # Exchange code for tokens
     try:
-        token_data = {
-            "grant_type": "authorization_code",
-            "code": code,
-            "client_id": EGOV_CLIENT_ID,
-            "redirect_uri": EGOV_REDIRECT_URI,
-        }
-
-        if EGOV_CLIENT_SECRET:
-            token_data["client_secret"] = EGOV_CLIENT_SECRET
-
-        token_response = requests.post(
-            f"{EGOV_BASE_URL}/oauth2/token",
-            data=token_data,
-            headers={"Content-Type": "application/x-www-form-urlencoded"}
-        )
+        token_response = egov_client.exchange_code(code)
 
         if not token_response.ok:
             return jsonify({"error": f"Token exchange failed: {token_response.text}"}), 400
 
         tokens = token_response.json()
         access_token = tokens.get("access_token")
+        if not access_token:
+            return jsonify({"error": "Token exchange failed: no access token"}), 400
 
         # Get user info
-        user_response = requests.get(
-            f"{EGOV_BASE_URL}/oauth2/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
+        user_info = egov_client.userinfo(access_token)
 
-        if not user_response.ok:
+        if user_info is None:
             return jsonify({"error": "Failed to get user info"}), 400
 
-        user_info = user_response.json()
-
         # Return user info to frontend
         return jsonify({
             "success": True,
@@ -360,6 +3409,8 @@ def egov_callback():
             "access_token": access_token,
         })
 
+    except EgovUnavailable as exc:
+        return busy_response(exc, 503, egov_client.breaker.retry_after())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -382,7 +3433,13 @@ def egov_session():
 
 @app.post("/api/auth/egov/register")
 def egov_register():
-    """Register/login user via eGov data"""
+    """Register/login user via eGov data.
+
+    One upsert keyed on email, IIN hash or phone. The unique email and
+    iin_hash indexes turn a concurrent duplicate insert into a retry.
+    Phone-only accounts get a phone@egov.local placeholder email, which the
+    email index covers. eGov accounts have no password.
+    """
     payload = request.get_json(force=True)
     email = payload.get("email")
     iin = payload.get("iin")
@@ -393,106 +3450,86 @@ def egov_register():
     if not email and not iin and not phone:
         return jsonify({"error": "email, iin, or phone is required"}), 400
 
-    # Find or create user by any available identifier
-    query = {}
+    iin_hash = hash_iin(iin) if iin else None
     if email:
-        query["email"] = email
+        query = {"email": email}
     elif iin:
-        query["iin_hash"] = hash_iin(iin)
-    elif phone:
-        query["phone"] = phone
+        query = {"iin_hash": iin_hash}
+    else:
+        query = {"phone": phone}
 
-    existing_user = db.users.find_one(query)
+    now = datetime.utcnow()
+    update_fields = {"egov_auth": True, "updated_at": now}
+    if phone:
+        update_fields["phone"] = phone
+    if fullName:
+        update_fields["fullName"] = fullName
+    if iin:
+        update_fields["iin_encrypted"] = encrypt_iin(iin)
+        update_fields["iin_hash"] = iin_hash
+    if email:
+        update_fields["email"] = email
+    new_id = ObjectId()
+    on_insert = {
+        "_id": new_id,
+        "email": f"{phone}@egov.local" if phone else None,
+        "iin_encrypted": None,
+        "iin_hash": None,
+        "phone": None,
+        "fullName": None,
+        "role": role,
+        "xp": 0,
+        "level": "novice",
+        "professionalism": 0,
+        "created_at": now,
+    }
+    update = stamp_update({
+        "$set": update_fields,
+        "$setOnInsert": {field: value for field, value in on_insert.items() if field not in update_fields},
+    })
 
-    if existing_user:
-        # Update user info
-        update_fields = {
-            "egov_auth": True,
-            "updated_at": datetime.utcnow()
-        }
-        if phone:
-            update_fields["phone"] = phone
-        if fullName:
-            update_fields["fullName"] = fullName
-        if iin:
-            update_fields["iin_encrypted"] = encrypt_iin(iin)
-            update_fields["iin_hash"] = hash_iin(iin)
-        if email:
-            update_fields["email"] = email
-        if "xp" not in existing_user:
-            update_fields["xp"] = 0
-            update_fields["level"] = "novice"
-            update_fields["professionalism"] = 0
-        
-        # Also update freelancer profile if exists
-        user_id = str(existing_user["_id"])
-        freelancer = db.freelancers.find_one({"user_id": user_id})
-        if freelancer:
-            update_freelancer = {"updated_at": datetime.utcnow()}
-            if phone:
-                update_freelancer["phone"] = phone
-            db.freelancers.update_one({"user_id": user_id}, {"$set": update_freelancer})
-        
-        db.users.update_one(
-            {"_id": existing_user["_id"]},
-            {"$set": update_fields}
+    def upsert_user():
+        return db.users.find_one_and_update(
+            query, update,
+            projection={"role": 1, "phone": 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
         )
 
+    try:
+        try:
+            before = upsert_user()
+        except DuplicateKeyError:
+            # Lost an insert race against a concurrent login; the retry updates.
+            before = upsert_user()
+    except DuplicateKeyError as exc:
+        # Not a race: the IIN (or placeholder email) belongs to another account.
+        if duplicate_key_field(exc) == "iin_hash":
+            return jsonify({"error": "iin already registered to another account"}), 409
+        return jsonify({"error": "account conflicts with an existing user"}), 409
+
+    if before is not None:
+        user_id = str(before["_id"])
+        if phone and phone != before.get("phone"):
+            record_mirror_change(user_id, "profile")
+        invalidate_profile(user_id)
         return jsonify({
             "user_id": user_id,
-            "role": existing_user.get("role", "freelancer"),
+            "role": before.get("role", "freelancer"),
             "existing": True
         })
 
-    # Create new user - use phone as email substitute if email not provided
-    # Generate a random password since user will login via eGov
-    random_password = bcrypt.hashpw(os.urandom(32), bcrypt.gensalt()).decode('utf-8')
-    
-    # If no email, use phone@egov.local as placeholder
-    user_email = email if email else (f"{phone}@egov.local" if phone else None)
-    iin_encrypted = encrypt_iin(iin) if iin else None
-    iin_hash = hash_iin(iin) if iin else None
-
-    user = {
-        "email": user_email,
-        "iin_encrypted": iin_encrypted,
-        "iin_hash": iin_hash,
-        "phone": phone,
-        "fullName": fullName,
-        "password": random_password,
-        "role": role,
-        "xp": 0,
-        "level": "novice",
-        "professionalism": 0,
-        "egov_auth": True,
-        "created_at": datetime.utcnow()
-    }
-
-    result = db.users.insert_one(user)
-    user_id = str(result.inserted_id)
-    
-    # Create freelancer profile for the user
+    user_id = str(new_id)
     if role in ["freelancer", "both"]:
-        freelancer_profile = {
-            "user_id": user_id,
-            "title": "",
-            "bio": "",
-            "skills": [],
-            "hourly_rate": None,
-            "location": "",
-            "languages": [],
-            "education": [],
-            "experience": [],
-            "certifications": [],
-            "completed_projects": 0,
-            "rating": 0,
-            "professionalism": 0,
-            "level": "novice",
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        db.freelancers.insert_one(freelancer_profile)
-    
+        freelancer_profile = new_freelancer_profile(user_id)
+        result = db.freelancers.update_one(
+            {"user_id": user_id},
+            stamp_update({"$setOnInsert": freelancer_profile}),
+            upsert=True,
+        )
+        if result.upserted_id is not None:
+            freelancers_inserted([{"_id": result.upserted_id, **freelancer_profile}])
+
     return jsonify({"user_id": user_id, "role": role, "existing": False}), 201
 
 
@@ -533,15 +3570,10 @@ def egov_verify():
         update_fields["level"] = "novice"
         update_fields["professionalism"] = 0
 
-    db.users.update_one({"_id": object_id}, {"$set": update_fields})
-
-    # Also update freelancer profile if exists
-    freelancer = db.freelancers.find_one({"user_id": user_id})
-    if freelancer:
-        freelancer_update = {"updated_at": datetime.utcnow()}
-        if phone:
-            freelancer_update["phone"] = phone
-        db.freelancers.update_one({"user_id": user_id}, {"$set": freelancer_update})
+    mirror_change(user_id, "profile", write=lambda session: db.users.update_one(
+        {"_id": object_id}, stamp_update({"$set": update_fields}), session=session
+    ))
+    invalidate_profile(user_id)
 
     user = db.users.find_one({"_id": object_id})
     return jsonify({
@@ -562,30 +3594,38 @@ def get_current_user():
     if not object_id:
         return jsonify({"error": "invalid user id"}), 400
     
-    user = db.users.find_one({"_id": object_id})
-    if not user:
+    profile = load_profile(user_id, object_id)
+    if not profile:
         return jsonify({"error": "user not found"}), 404
 
-    if "xp" not in user:
-        db.users.update_one(
-            {"_id": object_id},
-            {"$set": {"xp": 0, "level": "novice", "professionalism": 0}}
-        )
-        user["xp"] = 0
-        user["level"] = "novice"
-        user["professionalism"] = 0
-
     # Get freelancer profile if applicable
     freelancer = None
-    if user.get("role") in ["freelancer", "both"]:
-        freelancer = db.freelancers.find_one({"user_id": user_id})
+    if profile["user"].get("role") in ["freelancer", "both"]:
+        freelancer = profile["freelancer"]
     
     return jsonify({
-        "user": attach_masked_iin(serialize(user)),
-        "freelancer": serialize(freelancer)
+        "user": profile["user"],
+        "freelancer": freelancer
     })
 
 
+MAX_CATEGORIES = 5
+
+
+def parse_categories(value: Any) -> List[str]:
+    """Freelancer categories (the job categories they work in), as used by feeds and leaderboards."""
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError("categories must be a list of strings")
+    categories = []
+    for item in value:
+        category = " ".join(item.split()).casefold()
+        if category and category not in categories:
+            categories.append(category)
+    if len(categories) > MAX_CATEGORIES:
+        raise ValueError(f"at most {MAX_CATEGORIES} categories")
+    return categories
+
+
 @app.put("/api/users/me")
 def update_current_user():
     """Update current user profile"""
@@ -600,21 +3640,23 @@ def update_current_user():
     payload = request.get_json(force=True)
     
     # Fields that can be updated
-    allowed_fields = ["fullName", "phone", "title", "bio", "location", "hourly_rate", "languages"]
+    allowed_fields = ["fullName", "phone", "title", "bio", "location", "hourly_rate", "languages", "categories"]
     update_data = {k: v for k, v in payload.items() if k in allowed_fields}
+    if "categories" in update_data:
+        try:
+            update_data["categories"] = parse_categories(update_data["categories"])
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
     update_data["updated_at"] = datetime.utcnow()
     
-    # Update user
-    db.users.update_one({"_id": object_id}, {"$set": update_data})
+    # Update user; the freelancer profile follows via the outbox
+    refresh_feed = "title" in update_data or "categories" in update_data
+    mirror_change(user_id, "profile", refresh_feed=refresh_feed, write=lambda session: db.users.update_one(
+        {"_id": object_id}, stamp_update({"$set": update_data}), session=session
+    ))
+    invalidate_profile(user_id)
     
-    # Update freelancer profile if exists
-    freelancer = db.freelancers.find_one({"user_id": user_id})
-    if freelancer:
-        freelancer_update = {k: v for k, v in payload.items() if k in ["title", "bio", "location", "hourly_rate", "languages"]}
-        freelancer_update["updated_at"] = datetime.utcnow()
-        db.freelancers.update_one({"user_id": user_id}, {"$set": freelancer_update})
-    
-    user = db.users.find_one({"_id": object_id})
+    user = db.users.find_one({"_id": object_id}, USER_PROJECTION)
     return jsonify({"user": serialize(user)})
 
 
@@ -624,26 +3666,26 @@ def get_profile(user_id):
     object_id = parse_object_id(user_id)
     if not object_id:
         return jsonify({"error": "invalid user id"}), 400
+    try:
+        projection = parse_fields(FREELANCER_FIELDS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
     
-    user = db.users.find_one({"_id": object_id})
-    if not user:
+    profile = load_profile(user_id, object_id)
+    if not profile:
         return jsonify({"error": "user not found"}), 404
-
-    if "xp" not in user:
-        db.users.update_one(
-            {"_id": object_id},
-            {"$set": {"xp": 0, "level": "novice", "professionalism": 0}}
-        )
-        user["xp"] = 0
-        user["level"] = "novice"
-        user["professionalism"] = 0
+    etag = make_etag(doc_version(profile["user"]), doc_version(profile["freelancer"]))
+    if client_has(etag):
+        return not_modified(etag, PRIVATE_CACHE_CONTROL)
     
-    freelancer = db.freelancers.find_one({"user_id": user_id})
+    freelancer = profile["freelancer"]
+    if freelancer and projection is not None:
+        freelancer = {k: v for k, v in freelancer.items() if k in projection or k == "_id"}
     
-    return jsonify({
-        "user": attach_masked_iin(serialize(user)),
-        "freelancer": serialize(freelancer)
-    })
+    return with_validators(jsonify({
+        "user": profile["user"],
+        "freelancer": freelancer
+    }), etag, PRIVATE_CACHE_CONTROL)
 
 
 @app.post("/api/profile/education")
@@ -664,19 +3706,11 @@ def add_education():
         "created_at": datetime.utcnow()
     }
     
-    result = db.education.insert_one({
-        "user_id": user_id,
-        **education
-    })
-    
-    # Also update freelancer profile
-    db.freelancers.update_one(
-        {"user_id": user_id},
-        {
-            "$push": {"education": education},
-            "$set": {"updated_at": datetime.utcnow()}
-        }
-    )
+    document = stamp_insert({"user_id": user_id, **education})
+    result = mirror_change(user_id, "education", write=lambda session: db.education.insert_one(
+        document, session=session
+    ))
+    invalidate_profile(user_id)
     
     return jsonify({"education_id": str(result.inserted_id), **education}), 201
 
@@ -696,16 +3730,11 @@ def delete_education(education_id):
     if not education:
         return jsonify({"error": "education not found"}), 404
     
-    db.education.delete_one({"_id": object_id})
-    
-    # Remove from freelancer profile
-    db.freelancers.update_one(
-        {"user_id": user_id},
-        {
-            "$pull": {"education": {"institution": education.get("institution")}},
-            "$set": {"updated_at": datetime.utcnow()}
-        }
-    )
+    mirror_change(user_id, "education", write=lambda session: db.education.delete_one(
+        {"_id": object_id}, session=session
+    ))
+    record_deletion("education", object_id)
+    invalidate_profile(user_id)
     
     return jsonify({"success": True})
 
@@ -728,19 +3757,10 @@ def add_experience():
         "created_at": datetime.utcnow()
     }
     
-    result = db.experience.insert_one({
-        "user_id": user_id,
-        **experience
-    })
-    
-    # Also update freelancer profile
-    db.freelancers.update_one(
-        {"user_id": user_id},
-        {
-            "$push": {"experience": experience},
-            "$set": {"updated_at": datetime.utcnow()}
-        }
-    )
+    document = stamp_insert({"user_id": user_id, **experience})
+    result = mirror_change(user_id, "experience", refresh_feed=bool(experience["skills_used"]),
+                           write=lambda session: db.experience.insert_one(document, session=session))
+    invalidate_profile(user_id)
     
     return jsonify({"experience_id": str(result.inserted_id), **experience}), 201
 
@@ -760,16 +3780,10 @@ def delete_experience(experience_id):
     if not exp:
         return jsonify({"error": "experience not found"}), 404
     
-    db.experience.delete_one({"_id": object_id})
-    
-    # Remove from freelancer profile
-    db.freelancers.update_one(
-        {"user_id": user_id},
-        {
-            "$pull": {"experience": {"company": exp.get("company")}},
-            "$set": {"updated_at": datetime.utcnow()}
-        }
-    )
+    mirror_change(user_id, "experience", refresh_feed=bool(exp.get("skills_used")),
+                  write=lambda session: db.experience.delete_one({"_id": object_id}, session=session))
+    record_deletion("experience", object_id)
+    invalidate_profile(user_id)
     
     return jsonify({"success": True})
 
@@ -788,13 +3802,18 @@ def add_skill():
         return jsonify({"error": "skill is required"}), 400
     
     # Add to skills array if not exists
-    db.freelancers.update_one(
-        {"user_id": user_id},
-        {
+    result = db.freelancers.update_one(
+        {"user_id": user_id, "skills": {"$ne": skill}},
+        stamp_update({
             "$addToSet": {"skills": skill},
             "$set": {"updated_at": datetime.utcnow()}
-        }
+        })
     )
+    if result.modified_count:
+        skill_index.update(("freelancers", user_id), skill, 1)
+        sync_freelancer_match(user_id)
+        schedule_feed_refresh(user_id)
+        invalidate_profile(user_id)
     
     return jsonify({"success": True, "skill": skill})
 
@@ -812,21 +3831,153 @@ def remove_skill():
     if not skill:
         return jsonify({"error": "skill is required"}), 400
     
-    db.freelancers.update_one(
-        {"user_id": user_id},
-        {
+    result = db.freelancers.update_one(
+        {"user_id": user_id, "skills": skill},
+        stamp_update({
             "$pull": {"skills": skill},
             "$set": {"updated_at": datetime.utcnow()}
-        }
+        })
     )
+    if result.modified_count:
+        skill_index.update(("freelancers", user_id), skill, -1)
+        sync_freelancer_match(user_id)
+        schedule_feed_refresh(user_id)
+        invalidate_profile(user_id)
     
     return jsonify({"success": True})
 
 
+FREELANCER_SORT_FIELDS = ("rating", "hourly_rate", "completed_projects", "professionalism", "created_at")
+FREELANCER_FACETS = ("skills", "level", "location")
+
+
+def list_arg(name: str) -> List[str]:
+    """Read a comma separated and/or repeated query parameter."""
+    values = []
+    for raw in request.args.getlist(name):
+        values.extend(value.strip() for value in raw.split(",") if value.strip())
+    return values
+
+
+def float_arg(name: str) -> Optional[float]:
+    raw = request.args.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+def parse_sort(allowed: Tuple[str, ...]) -> Tuple[str, int]:
+    raw = request.args.get("sort")
+    if not raw:
+        return "_id", ASCENDING
+    direction = DESCENDING if raw.startswith("-") else ASCENDING
+    field = raw.lstrip("-+")
+    if field not in allowed:
+        raise ValueError(f"sort must be one of: {', '.join(allowed)}")
+    return field, direction
+
+
+def freelancer_filters() -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    skills = list_arg("skills")
+    if skills:
+        mode = request.args.get("skills_mode", "any")
+        if mode not in ("any", "all"):
+            raise ValueError("skills_mode must be any or all")
+        query["skills"] = {"$all" if mode == "all" else "$in": skills}
+    for field in ("location", "languages", "level"):
+        values = list_arg(field)
+        if values:
+            query[field] = {"$in": values}
+    min_rate = float_arg("min_rate")
+    max_rate = float_arg("max_rate")
+    if min_rate is not None or max_rate is not None:
+        query["hourly_rate"] = {}
+        if min_rate is not None:
+            query["hourly_rate"]["$gte"] = min_rate
+        if max_rate is not None:
+            query["hourly_rate"]["$lte"] = max_rate
+    min_rating = float_arg("min_rating")
+    if min_rating is not None:
+        query["rating"] = {"$gte": min_rating}
+    return query
+
+
 @app.get("/api/freelancers")
 def list_freelancers():
-    freelancers = [serialize(doc) for doc in db.freelancers.find()]
-    return jsonify(freelancers)
+    """Freelancer directory.
+
+    Filters: skills (comma list, skills_mode=any|all), location, languages,
+    level (comma lists), min_rate/max_rate, min_rating.
+    sort: rating, hourly_rate, completed_projects, professionalism, created_at,
+    prefixed with "-" for descending. facets=1 adds skills/level/location counts.
+    """
+    try:
+        projection = parse_fields(FREELANCER_FIELDS, FREELANCER_CARD_FIELDS)
+        query = freelancer_filters()
+        sort_field, direction = parse_sort(FREELANCER_SORT_FIELDS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if request.args.get("facets", "").lower() in {"1", "true", "yes"}:
+        return faceted_list_response(db.freelancers, query, FREELANCER_FACETS, sort_field, direction, projection)
+    return list_response(db.freelancers, query, sort_field, direction, projection)
+
+
+BATCH_GET_LIMIT = int(os.getenv("BATCH_GET_LIMIT", "300"))
+
+
+def batch_get_response(collection, projection: Optional[Dict[str, int]] = None, transform=serialize):
+    """Resolve {"ids": [...]} with a single $in query.
+
+    Returns {"results": {id: document or null}, "not_found": [id, ...]};
+    ids that are not valid ObjectIds are reported as not found.
+    """
+    payload = request.get_json(force=True, silent=True) or {}
+    ids = payload.get("ids")
+    if not isinstance(ids, list) or not ids:
+        return jsonify({"error": "ids must be a non-empty list"}), 400
+    if len(ids) > BATCH_GET_LIMIT:
+        return jsonify({"error": f"at most {BATCH_GET_LIMIT} ids per request"}), 400
+    requested = list(dict.fromkeys(str(value) for value in ids))
+    object_ids = {value: parse_object_id(value) for value in requested}
+    valid = [object_id for object_id in object_ids.values() if object_id]
+    found = {}
+    if valid:
+        found = {doc["_id"]: doc for doc in collection.find({"_id": {"$in": valid}}, projection)}
+    results = {}
+    not_found = []
+    for value in requested:
+        doc = found.get(object_ids[value])
+        results[value] = transform(doc) if doc else None
+        if doc is None:
+            not_found.append(value)
+    return jsonify({"results": results, "not_found": not_found})
+
+
+@app.post("/api/freelancers:batchGet")
+def batch_get_freelancers():
+    try:
+        projection = parse_fields(FREELANCER_FIELDS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return batch_get_response(db.freelancers, projection)
+
+
+@app.post("/api/users:batchGet")
+def batch_get_users():
+    return batch_get_response(db.users, USER_PROJECTION, lambda doc: attach_masked_iin(serialize(doc)))
+
+
+@app.post("/api/jobs:batchGet")
+def batch_get_jobs():
+    try:
+        projection = parse_fields(JOB_FIELDS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return batch_get_response(db.jobs, projection)
 
 
 @app.get("/api/freelancers/<freelancer_id>")
@@ -834,31 +3985,44 @@ def get_freelancer(freelancer_id):
     object_id = parse_object_id(freelancer_id)
     if not object_id:
         return jsonify({"error": "invalid freelancer id"}), 400
-    doc = db.freelancers.find_one({"_id": object_id})
-    if not doc:
-        return jsonify({"error": "not found"}), 404
-    return jsonify(serialize(doc))
+    try:
+        projection = parse_fields(FREELANCER_FIELDS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return conditional_document(db.freelancers, object_id, projection)
 
 
 @app.post("/api/freelancers")
 def create_freelancer():
     payload = request.get_json(force=True)
     payload["created_at"] = datetime.utcnow()
-    result = db.freelancers.insert_one(payload)
+    result = db.freelancers.insert_one(stamp_insert(payload))
+    freelancers_inserted([payload])
     return jsonify({"freelancer_id": str(result.inserted_id)}), 201
 
 
+@app.get("/api/skills/suggest")
+def suggest_skills():
+    """Skill autocomplete, ordered by how many freelancers and jobs use each skill."""
+    prefix = request.args.get("prefix", "")
+    try:
+        limit = int(request.args.get("limit", 10))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    limit = max(1, min(limit, 50))
+    return jsonify({"prefix": prefix, "suggestions": skill_index.suggest(prefix, limit)})
+
+
 @app.get("/api/clients")
 def list_clients():
-    clients = [serialize(doc) for doc in db.clients.find()]
-    return jsonify(clients)
+    return list_response(db.clients, {})
 
 
 @app.post("/api/clients")
 def create_client():
     payload = request.get_json(force=True)
     payload["created_at"] = datetime.utcnow()
-    result = db.clients.insert_one(payload)
+    result = db.clients.insert_one(stamp_insert(payload))
     return jsonify({"client_id": str(result.inserted_id)}), 201
 
 
@@ -866,15 +4030,23 @@ def create_client():
 def list_reviews():
     freelancer_id = request.args.get("freelancer_id")
     query = {"freelancer_id": freelancer_id} if freelancer_id else {}
-    reviews = [serialize(doc) for doc in db.reviews.find(query)]
-    return jsonify(reviews)
+    try:
+        sort_field, direction = parse_sort(("created_at",))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return list_response(db.reviews, query, sort_field, direction)
 
 
 @app.post("/api/reviews")
 def create_review():
     payload = request.get_json(force=True)
+    error = validate_review(payload)
+    if error:
+        return jsonify({"error": error}), 400
+
     payload["created_at"] = datetime.utcnow()
-    result = db.reviews.insert_one(payload)
+    result = db.reviews.insert_one(stamp_insert(payload))
+    reviews_inserted([payload])
     return jsonify({"review_id": str(result.inserted_id)}), 201
 
 
@@ -882,15 +4054,18 @@ def create_review():
 def list_projects():
     freelancer_id = request.args.get("freelancer_id")
     query = {"freelancer_id": freelancer_id} if freelancer_id else {}
-    projects = [serialize(doc) for doc in db.projects.find(query)]
-    return jsonify(projects)
+    try:
+        sort_field, direction = parse_sort(("created_at",))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return list_response(db.projects, query, sort_field, direction)
 
 
 @app.post("/api/projects")
 def create_project():
     payload = request.get_json(force=True)
     payload["created_at"] = datetime.utcnow()
-    result = db.projects.insert_one(payload)
+    result = db.projects.insert_one(stamp_insert(payload))
     return jsonify({"project_id": str(result.inserted_id)}), 201
 
 
@@ -899,10 +4074,21 @@ def list_jobs():
     search = request.args.get("q")
     category = request.args.get("category")
     query = {}
+    try:
+        projection = parse_fields(JOB_FIELDS, JOB_CARD_FIELDS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     if category and category != "all":
         query["category"] = category
 
+    etag = make_etag(collection_version(db.jobs), job_search.ready, request.accept_mimetypes)
+    if client_has(etag):
+        return not_modified(etag)
+
+    if search and job_search.ready:
+        return with_validators(search_jobs_response(search, query.get("category"), projection), etag)
+
     if search:
         query["$or"] = [
             {"title": {"$regex": search, "$options": "i"}},
@@ -910,8 +4096,7 @@ def list_jobs():
             {"skills": {"$elemMatch": {"$regex": search, "$options": "i"}}},
         ]
 
-    jobs = [serialize(doc) for doc in db.jobs.find(query).sort("created_at", -1)]
-    return jsonify(jobs)
+    return with_validators(list_response(db.jobs, query, "created_at", DESCENDING, projection), etag)
 
 
 @app.get("/api/jobs/<job_id>")
@@ -919,43 +4104,222 @@ def get_job(job_id):
     object_id = parse_object_id(job_id)
     if not object_id:
         return jsonify({"error": "invalid job id"}), 400
-    doc = db.jobs.find_one({"_id": object_id})
-    if not doc:
+    return conditional_document(db.jobs, object_id)
+
+
+@app.get("/api/jobs/<job_id>/matches")
+def get_job_matches(job_id):
+    """Top freelancers for a job, scored on skills, rating, level, rate and location."""
+    object_id = parse_object_id(job_id)
+    if not object_id:
+        return jsonify({"error": "invalid job id"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), MAX_PAGE_LIMIT))
+        projection = parse_fields(FREELANCER_FIELDS, FREELANCER_CARD_FIELDS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    job = db.jobs.find_one({"_id": object_id}, {"skills": 1, "level": 1, "budget": 1, "hourly_rate": 1, "location": 1})
+    if not job:
         return jsonify({"error": "not found"}), 404
-    return jsonify(serialize(doc))
+    ranked = freelancer_matcher.top_k(job, limit)
+    scores = {freelancer_id: score for score, freelancer_id in ranked}
+    docs = fetch_in_order(db.freelancers, [ObjectId(freelancer_id) for _, freelancer_id in ranked], projection)
+    return jsonify({
+        "job_id": job_id,
+        "matches": [{"score": round(scores[str(doc["_id"])], 4), "freelancer": doc} for doc in docs],
+    })
 
 
 @app.post("/api/jobs")
 def create_job():
     payload = request.get_json(force=True)
-    title = payload.get("title")
-    description = payload.get("description")
-
-    if not title or not description:
-        return jsonify({"error": "title and description required"}), 400
+    error = validate_job(payload)
+    if error:
+        return jsonify({"error": error}), 400
 
     payload["created_at"] = datetime.utcnow()
-    result = db.jobs.insert_one(payload)
+    result = db.jobs.insert_one(stamp_insert(payload))
+    jobs_inserted([payload])
     return jsonify({"job_id": str(result.inserted_id)}), 201
 
 
+@app.get("/api/feed")
+def get_job_feed():
+    """Recommended jobs for the current freelancer, read from job_feeds."""
+    user_id = request.headers.get("X-User-Id")
+    if not user_id:
+        return jsonify({"error": "user not authenticated"}), 401
+    try:
+        limit = max(1, min(int(request.args.get("limit", DEFAULT_PAGE_LIMIT)), FEED_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    feed = db.job_feeds.find_one({"_id": user_id}, {"jobs": {"$slice": limit}, "updated_at": 1})
+    if feed is None:
+        entries = recompute_feed(user_id)
+        if entries is None:
+            return jsonify({"error": "freelancer profile not found"}), 404
+        feed = {"jobs": entries[:limit], "updated_at": datetime.utcnow()}
+    return jsonify({"items": feed["jobs"], "updated_at": feed.get("updated_at")})
+
+
+PROFILE_SUBLIST_LIMIT = int(os.getenv("PROFILE_SUBLIST_LIMIT", "10"))
+
+
 @app.get("/api/profiles/<freelancer_id>")
 def get_freelancer_profile(freelancer_id):
     object_id = parse_object_id(freelancer_id)
     if not object_id:
         return jsonify({"error": "invalid freelancer id"}), 400
 
-    freelancer = db.freelancers.find_one({"_id": object_id})
+    try:
+        limits = {
+            name: max(0, min(int(request.args.get(f"{name}_limit", PROFILE_SUBLIST_LIMIT)), MAX_PAGE_LIMIT))
+            for name in ("projects", "reviews")
+        }
+    except ValueError:
+        return jsonify({"error": "projects_limit and reviews_limit must be numbers"}), 400
+
+    # One round trip: the freelancer plus, per sub-collection, the newest
+    # `limit + 1` documents and a total/latest-marker summary.
+    pipeline = [{"$match": {"_id": object_id}}, {"$limit": 1}]
+    for name, limit in limits.items():
+        match = {"$match": {"freelancer_id": freelancer_id}}
+        pipeline.append({"$lookup": {
+            "from": name,
+            "pipeline": [match, {"$sort": {"created_at": -1, "_id": -1}}, {"$limit": limit + 1}],
+            "as": name,
+        }})
+        pipeline.append({"$lookup": {
+            "from": name,
+            "pipeline": [match, {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                CHANGE_FIELD: {"$max": f"${CHANGE_FIELD}"},
+            }}],
+            "as": f"{name}_summary",
+        }})
+    freelancer = next(db.freelancers.aggregate(pipeline), None)
     if not freelancer:
         return jsonify({"error": "not found"}), 404
 
-    projects = [serialize(doc) for doc in db.projects.find({"freelancer_id": freelancer_id})]
-    reviews = [serialize(doc) for doc in db.reviews.find({"freelancer_id": freelancer_id})]
+    summaries = {name: (freelancer.pop(f"{name}_summary") or [{}])[0] for name in limits}
+    # Projects and reviews are insert-only, so their newest markers plus the
+    # freelancer's own marker version the whole response.
+    etag = make_etag(doc_version(freelancer), *(
+        f"{doc_version(summary)}:{summary.get('total', 0)}" for summary in summaries.values()
+    ))
+    if client_has(etag):
+        return not_modified(etag)
+
+    body = {}
+    for name, limit in limits.items():
+        docs = freelancer.pop(name)
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            if docs:
+                next_cursor = encode_cursor(docs[-1], "created_at")
+        body[name] = [serialize(doc) for doc in docs]
+        body[f"{name}_total"] = summaries[name].get("total", 0)
+        # Continue with /api/<name>?freelancer_id=...&sort=-created_at&cursor=...
+        body[f"{name}_next_cursor"] = next_cursor
+    body["freelancer"] = serialize(freelancer)
+    return with_validators(jsonify(body), etag)
+
+
+SYNC_COLLECTIONS = ("jobs", "freelancers", "messages", "reviews", "projects", "clients", "education", "experience")
+# Below every server-assigned marker. Timestamp(0, 0) itself is avoided: it is
+# the "fill me in" placeholder.
+SYNC_EPOCH = Timestamp(0, 1)
+# Markers are taken when a write executes, not when it commits (a
+# mirror_change transaction commits a round trip later), and $$CLUSTER_TIME
+# stamps from pipeline updates can repeat. So pages are ordered by
+# (_changed, _id) and never reach the last SYNC_SETTLE_SECONDS of server time:
+# a write stamped earlier than that has committed by now.
+SYNC_SETTLE_SECONDS = int(os.getenv("SYNC_SETTLE_SECONDS", "5"))
+
+
+def encode_sync_token(marker: Timestamp, last_id: Any = None) -> str:
+    raw = json_util.dumps({"t": marker, "id": last_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_sync_token(token: str) -> Tuple[Timestamp, Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        if raw.startswith("{"):
+            payload = json_util.loads(raw)
+            if not isinstance(payload["t"], Timestamp):
+                raise ValueError("marker is not a timestamp")
+            return payload["t"], payload.get("id")
+        # Tokens issued before the _id tie-breaker: "<time>.<inc>".
+        time_part, inc_part = raw.split(".")
+        return Timestamp(int(time_part), int(inc_part)), None
+    except Exception:
+        raise ValueError("invalid since token")
+
 
+def sync_horizon() -> Timestamp:
+    """Markers at or above this may still belong to uncommitted writes."""
+    now = db.command("hello")["localTime"]
+    seconds = int(now.replace(tzinfo=timezone.utc).timestamp())
+    return Timestamp(max(seconds - SYNC_SETTLE_SECONDS, 0), 0)
+
+
+def sync_filter(since: Timestamp, last_id: Any, horizon: Timestamp) -> Dict[str, Any]:
+    if last_id is None:
+        return {CHANGE_FIELD: {"$gt": since, "$lt": horizon}}
+    return {"$and": [
+        {CHANGE_FIELD: {"$lt": horizon}},
+        {"$or": [{CHANGE_FIELD: {"$gt": since}}, {CHANGE_FIELD: since, "_id": {"$gt": last_id}}]},
+    ]}
+
+
+@app.get("/api/sync/<collection>")
+def sync_collection(collection):
+    """Documents created/changed and ids deleted after `since`, oldest first.
+
+    Start without `since` for a full snapshot, then pass back `next_token`
+    until `has_more` is false; later polls only return the delta. Changes
+    show up once they are SYNC_SETTLE_SECONDS old.
+    """
+    if collection not in SYNC_COLLECTIONS:
+        return jsonify({"error": "unknown collection"}), 404
+    try:
+        since, last_id = decode_sync_token(request.args["since"]) if request.args.get("since") else (SYNC_EPOCH, None)
+        limit = max(1, min(int(request.args.get("limit", MAX_PAGE_LIMIT)), MAX_PAGE_LIMIT))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    changed = sync_filter(since, last_id, sync_horizon())
+    order = [(CHANGE_FIELD, ASCENDING), ("_id", ASCENDING)]
+    docs = list(db[collection].find(changed).sort(order).limit(limit + 1))
+    deletions = list(
+        db.tombstones.find({"collection": collection, **changed}, {"doc_id": 1, CHANGE_FIELD: 1})
+        .sort(order).limit(limit + 1)
+    )
+    # Merge both streams in (marker, _id) order and cut at `limit`.
+    merged = heapq.merge(
+        ((doc[CHANGE_FIELD], doc["_id"], 0, doc) for doc in docs),
+        ((doc[CHANGE_FIELD], doc["_id"], 1, doc) for doc in deletions),
+        key=lambda item: (item[0], item[1]),
+    )
+    items, deleted = [], []
+    has_more = False
+    for count, (marker, doc_id, kind, doc) in enumerate(merged):
+        if count == limit:
+            has_more = True
+            break
+        since, last_id = marker, doc_id
+        if kind == 0:
+            items.append(serialize(doc))
+        else:
+            deleted.append(doc["doc_id"])
     return jsonify({
-        "freelancer": serialize(freelancer),
-        "projects": projects,
-        "reviews": reviews,
+        "items": items,
+        "deleted": deleted,
+        "next_token": encode_sync_token(since, last_id),
+        "has_more": has_more,
     })
 
 
@@ -963,18 +4327,173 @@ def get_freelancer_profile(freelancer_id):
 def list_messages():
     user_id = request.args.get("user_id")
     query = {"participants": user_id} if user_id else {}
-    messages = [serialize(doc) for doc in db.messages.find(query)]
-    return jsonify(messages)
+    return list_response(db.messages, query)
 
 
 @app.post("/api/messages")
 def create_message():
     payload = request.get_json(force=True)
     payload["created_at"] = datetime.utcnow()
-    result = db.messages.insert_one(payload)
+    result = db.messages.insert_one(stamp_insert(payload))
     return jsonify({"message_id": str(result.inserted_id)}), 201
 
 
+# ---------------------------------------------------------------------------
+# Bulk ingestion: POST /api/<collection>:bulkCreate
+# ---------------------------------------------------------------------------
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "5000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+
+def validate_job(payload: Dict[str, Any]) -> Optional[str]:
+    if not payload.get("title") or not payload.get("description"):
+        return "title and description required"
+    return None
+
+
+def jobs_inserted(jobs: List[Dict[str, Any]]):
+    """Keep the search, skill and feed structures in step with new jobs."""
+    with_skills = []
+    for job in jobs:
+        job_search.add(job)
+        if isinstance(job.get("skills"), list):
+            skill_index.update(("jobs", str(job["_id"])), job["skills"], 1)
+            with_skills.append(job)
+    if with_skills:
+        run_in_background(feed_executor, fan_out_jobs, with_skills)
+
+
+def freelancers_inserted(freelancers: List[Dict[str, Any]]):
+    for freelancer in freelancers:
+        if isinstance(freelancer.get("skills"), list):
+            skill_index.update(("freelancers", freelancer.get("user_id")), freelancer["skills"], 1)
+        freelancer_matcher.upsert(freelancer)
+        leaderboard.update_freelancer(freelancer)
+        invalidate_profile(freelancer.get("user_id"))
+
+
+def validate_review(payload: Dict[str, Any]) -> Optional[str]:
+    if payload.get("rating") is None:
+        return None
+    stars = review_stars(payload["rating"])
+    if stars is None:
+        return "rating must be a number between 1 and 5"
+    payload["rating"] = stars
+    return None
+
+
+def reviews_inserted(reviews: List[Dict[str, Any]]):
+    """Update rating aggregates, then the matcher and leaderboard, for the reviewed freelancers."""
+    object_ids = apply_review_ratings(reviews)
+    if not object_ids:
+        return
+    projection = {**FreelancerMatcher.PROJECTION, **Leaderboard.FREELANCER_PROJECTION, **RATING_PROJECTION}
+    docs = list(db.freelancers.find({"_id": {"$in": object_ids}}, projection))
+    fixes = []
+    for doc in docs:
+        score = stale_rating(doc)
+        if score is not None:
+            # Only if no other review landed in between; that writer sets its own score.
+            fixes.append(UpdateOne(
+                {"_id": doc["_id"], "rating_count": doc.get("rating_count"), "rating_sum": doc.get("rating_sum")},
+                stamp_update({"$set": {"rating": score}}),
+            ))
+            doc["rating"] = score
+    if fixes:
+        db.freelancers.bulk_write(fixes, ordered=False)
+    for doc in docs:
+        freelancer_matcher.upsert(doc)
+        leaderboard.update_freelancer(doc)
+        invalidate_profile(doc.get("user_id"))
+
+
+# collection -> (per-item validator, hook run on the inserted documents)
+BULK_COLLECTIONS = {
+    "jobs": (validate_job, jobs_inserted),
+    "freelancers": (None, freelancers_inserted),
+    "reviews": (validate_review, reviews_inserted),
+    "projects": (None, None),
+    "clients": (None, None),
+    "messages": (None, None),
+}
+
+
+def insert_chunk(collection, docs: List[Dict[str, Any]]) -> Dict[int, str]:
+    """Unordered insert_many; returns {position in docs: error message}.
+
+    An error other than BulkWriteError (a dropped connection, a timeout) can
+    leave the chunk partly applied, so the pre-assigned _ids are looked up
+    again and only the missing documents are reported as failed.
+    """
+    for doc in docs:
+        doc.setdefault("_id", ObjectId())
+    try:
+        collection.insert_many(docs, ordered=False)
+    except BulkWriteError as exc:
+        return {error["index"]: error.get("errmsg", "write failed") for error in exc.details.get("writeErrors", [])}
+    except PyMongoError as exc:
+        try:
+            found = {doc["_id"] for doc in collection.find({"_id": {"$in": [doc["_id"] for doc in docs]}}, {"_id": 1})}
+        except PyMongoError as check_exc:
+            app.logger.warning("bulk insert outcome unknown: %s", check_exc)
+            return {position: f"write outcome unknown: {exc}" for position in range(len(docs))}
+        return {position: str(exc) for position, doc in enumerate(docs) if doc["_id"] not in found}
+    return {}
+
+
+@app.post("/api/<collection>:bulkCreate")
+def bulk_create(collection):
+    """Insert {"items": [...]} with per-item results.
+
+    Each item is validated like the single-document endpoint, valid items are
+    written with unordered insert_many in BULK_CHUNK_SIZE chunks, and the
+    response lists {"index", "id"} or {"index", "error"} for every item.
+    """
+    if collection not in BULK_COLLECTIONS:
+        return jsonify({"error": f"bulk writes are not supported for {collection}"}), 404
+    payload = request.get_json(force=True, silent=True) or {}
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items must be a non-empty list"}), 400
+    if len(items) > BULK_MAX_ITEMS:
+        return jsonify({"error": f"at most {BULK_MAX_ITEMS} items per request"}), 400
+
+    validate, after_insert = BULK_COLLECTIONS[collection]
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    pending = []
+    now = datetime.utcnow()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            error = "item must be an object"
+        else:
+            error = validate(item) if validate else None
+        if error:
+            results[index] = {"index": index, "error": error}
+            continue
+        item["created_at"] = now
+        pending.append((index, stamp_insert(item)))
+
+    inserted = []
+    for start in range(0, len(pending), BULK_CHUNK_SIZE):
+        chunk = pending[start:start + BULK_CHUNK_SIZE]
+        errors = insert_chunk(db[collection], [doc for _, doc in chunk])
+        for position, (index, doc) in enumerate(chunk):
+            if position in errors:
+                results[index] = {"index": index, "error": errors[position]}
+            else:
+                results[index] = {"index": index, "id": str(doc["_id"])}
+                inserted.append(doc)
+
+    if inserted and after_insert:
+        after_insert(inserted)
+    return jsonify({
+        "inserted": len(inserted),
+        "failed": len(items) - len(inserted),
+        "results": results,
+    })
+
+
 if __name__ == "__main__":
     debug = os.getenv("FLASK_DEBUG", "0").lower() in {"1", "true", "yes"}
     app.run(debug=debug, port=8000, use_reloader=debug)
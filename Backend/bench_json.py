@@ -0,0 +1,97 @@
+"""Micro-benchmark for the JSON encoding of job lists.
+
+Compares the old path (serialize() + Flask's default provider) against
+MongoJSONProvider with the stdlib fallback and, when installed, orjson.
+
+    python Backend/bench_json.py [--docs 10000] [--rounds 5]
+"""
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+# Importing app must not try to reach MongoDB.
+os.environ.setdefault("AUTO_CREATE_INDEXES", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import app as backend  # noqa: E402
+
+
+def make_jobs(count):
+    now = datetime.utcnow()
+    skills = ["python", "react", "figma", "seo", "копирайтинг", "dizain", "sql", "go"]
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Job {i} — landing page",
+            "description": "Нужно сделать лендинг для кофейни. " * 4,
+            "category": ["design", "development", "writing"][i % 3],
+            "budget": f"{50 + i % 500}000 ₸",
+            "timeframe": "2 weeks",
+            "level": "intermediate",
+            "skills": skills[i % 5:i % 5 + 3],
+            "client_id": str(ObjectId()),
+            "client_name": "ТОО Example",
+            "proposals": i % 17,
+            "views": i % 311,
+            "created_at": now - timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_serialize(doc):
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+
+def bench(name, encode, jobs, rounds):
+    best = None
+    size = 0
+    for _ in range(rounds):
+        data = copy.deepcopy(jobs)
+        start = time.perf_counter()
+        size = len(encode(data))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(jobs) / best
+    print(f"{name:<28} {best * 1000:8.1f} ms  {rate:12,.0f} docs/s  {size / 1024:8.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    jobs = make_jobs(args.docs)
+    default_provider = DefaultJSONProvider(backend.app)
+    mongo_provider = backend.MongoJSONProvider(backend.app)
+
+    print(f"{args.docs} jobs, best of {args.rounds} rounds")
+    bench(
+        "serialize + flask default",
+        lambda docs: default_provider.dumps([legacy_serialize(doc) for doc in docs]).encode("utf-8"),
+        jobs,
+        args.rounds,
+    )
+    bench(
+        "stdlib json + json_default",
+        lambda docs: json.dumps(docs, default=backend.json_default, ensure_ascii=False,
+                                separators=(",", ":")).encode("utf-8"),
+        jobs,
+        args.rounds,
+    )
+    label = "MongoJSONProvider (orjson)" if backend.orjson else "MongoJSONProvider (stdlib)"
+    bench(label, mongo_provider.dumps_bytes, jobs, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Latency benchmark for the in-process job search index (JobSearchIndex).
+
+Builds the index over synthetic RU/EN job postings and times typical
+queries, including one- and two-letter search-as-you-type prefixes.
+
+    python Backend/bench_search.py [--docs 200000] [--rounds 20]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+from bson import ObjectId
+
+# Importing app must not try to reach MongoDB.
+os.environ.setdefault("AUTO_CREATE_INDEXES", "0")
+os.environ.setdefault("JOB_SEARCH_INDEX", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as backend  # noqa: E402
+
+TITLE_WORDS = [
+    "лендинг", "сайт", "дизайн", "логотип", "разработка", "магазин", "бот", "телеграм",
+    "перевод", "статья", "редизайн", "приложение", "мобильное", "парсер", "верстка",
+    "landing", "website", "design", "logo", "python", "react", "django", "shop", "app",
+    "сайт", "қазақ", "аударма", "жобасы", "банер", "презентация", "реклама", "таргет",
+]
+SKILLS = ["python", "react", "figma", "seo", "копирайтинг", "sql", "go", "photoshop",
+          "1c", "wordpress", "tilda", "excel", "smm", "vue", "node", "flutter"]
+CATEGORIES = ["design", "development", "writing", "marketing"]
+QUERIES = ["python", "w12", "р", "ра", "дизайн", "дизайн сайт", "разработка телеграм бот", "wor"]
+
+
+def make_jobs(count, seed=7):
+    rng = random.Random(seed)
+    filler = [f"w{i}" for i in range(20000)] + TITLE_WORDS * 20
+    for _ in range(count):
+        yield {
+            "_id": ObjectId(),
+            "title": " ".join(rng.sample(TITLE_WORDS, 3)),
+            "skills": rng.sample(SKILLS, 3),
+            "description": " ".join(rng.choice(filler) for _ in range(30)),
+            "category": rng.choice(CATEGORIES),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=21)
+    args = parser.parse_args()
+
+    index = backend.JobSearchIndex()
+    start = time.perf_counter()
+    index.rebuild(make_jobs(args.docs))
+    print(f"indexed {args.docs} jobs in {time.perf_counter() - start:.1f} s")
+
+    for query in QUERIES:
+        for category in (None, "design"):
+            timings = []
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                hits = index.search(query, category, args.limit)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            label = f"{query!r}" + (f" category={category}" if category else "")
+            print(f"{label:<40} p50 {timings[len(timings) // 2] * 1000:7.1f} ms"
+                  f"  max {timings[-1] * 1000:7.1f} ms  hits {len(hits)}")
+
+
+if __name__ == "__main__":
+    main()
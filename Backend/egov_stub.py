@@ -0,0 +1,83 @@
+"""Local stand-in for the eGov IdP, for offline development and load tests.
+
+Implements just enough of the OAuth endpoints used by app.py. Point the
+backend at it with EGOV_BASE_URL=http://127.0.0.1:9090.
+
+    python Backend/egov_stub.py [--port 9090] [--latency 0.05] [--error-rate 0.0]
+"""
+import time
+import random
+import hashlib
+import argparse
+from urllib.parse import urlencode
+
+from flask import Flask, jsonify, redirect, request
+
+app = Flask(__name__)
+settings = {"latency": 0.0, "error_rate": 0.0}
+
+
+@app.before_request
+def simulate_network():
+    if settings["latency"]:
+        time.sleep(settings["latency"])
+    if settings["error_rate"] and random.random() < settings["error_rate"]:
+        return jsonify({"error": "temporarily_unavailable"}), 503
+
+
+@app.get("/oauth2/authorize")
+def authorize():
+    redirect_uri = request.args.get("redirect_uri")
+    if not redirect_uri:
+        return jsonify({"error": "invalid_request"}), 400
+    code = request.args.get("login_hint") or hashlib.sha1(str(random.random()).encode()).hexdigest()[:16]
+    params = {"code": code}
+    if request.args.get("state"):
+        params["state"] = request.args["state"]
+    return redirect(f"{redirect_uri}?{urlencode(params)}")
+
+
+@app.post("/oauth2/token")
+def token():
+    if request.form.get("grant_type") != "authorization_code" or not request.form.get("code"):
+        return jsonify({"error": "invalid_grant"}), 400
+    return jsonify({
+        "access_token": f"stub-{request.form['code']}",
+        "token_type": "Bearer",
+        "expires_in": 3600,
+    })
+
+
+@app.get("/oauth2/userinfo")
+def userinfo():
+    auth = request.headers.get("Authorization", "")
+    if not auth.startswith("Bearer stub-"):
+        return jsonify({"error": "invalid_token"}), 401
+    # The same code always maps to the same person, so load tests can replay logins.
+    digest = hashlib.sha256(auth[len("Bearer "):].encode("utf-8")).hexdigest()
+    number = int(digest[:12], 16)
+    iin = f"{number % 10 ** 12:012d}"
+    return jsonify({
+        "sub": f"stub-{digest[:24]}",
+        "iin": iin,
+        "name": f"Stub User {iin[-4:]}",
+        "email": f"stub{iin}@egov.local",
+        "phone_number": f"+77{number % 10 ** 9:09d}",
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9090)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    settings["latency"] = args.latency
+    settings["error_rate"] = args.error_rate
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Feed candidate selection with mixed-case skills (recompute_feed / fan_out_job).
+
+Runs without MongoDB: the collections are small in-memory stand-ins that
+honour SKILL_COLLATION the way the server does (case-insensitive compare).
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from bson import ObjectId
+
+# Importing app must not try to reach MongoDB.
+os.environ.setdefault("AUTO_CREATE_INDEXES", "0")
+os.environ.setdefault("JOB_SEARCH_INDEX", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as backend  # noqa: E402
+
+
+class FakeCursor(list):
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def batch_size(self, count):
+        return self
+
+
+class FakeCollection:
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def _values(self, doc, path):
+        values = [doc]
+        for part in path.split("."):
+            found = []
+            for value in values:
+                value = value.get(part) if isinstance(value, dict) else None
+                found.extend(value if isinstance(value, list) else [value] if value is not None else [])
+            values = found
+        return values
+
+    def _matches(self, doc, query, fold):
+        if "$or" in query:
+            return any(self._matches(doc, branch, fold) for branch in query["$or"])
+        for path, condition in query.items():
+            wanted = {fold(value) for value in condition["$in"]}
+            if not any(fold(value) in wanted for value in self._values(doc, path)):
+                return False
+        return True
+
+    def find(self, query, projection=None, collation=None):
+        ignore_case = collation is not None and collation.document.get("strength") == 2
+        fold = str.casefold if ignore_case else str
+        return FakeCursor(doc for doc in self.docs if self._matches(doc, query, fold))
+
+
+class FeedSkillCaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.job = {
+            "_id": ObjectId(), "title": "API", "skills": ["Python", "Django"],
+            "category": "it", "created_at": datetime.utcnow(),
+        }
+        self.freelancer = {
+            "user_id": "u1", "skills": ["python"],
+            "experience": [{"skills_used": ["DJANGO"]}],
+        }
+        self.db = mock.MagicMock()
+        self.db.jobs = FakeCollection([self.job])
+        self.db.freelancers = FakeCollection([self.freelancer])
+        self.db.freelancers.find_one = lambda query, projection=None: self.freelancer
+        patch = mock.patch.object(backend, "db", self.db)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_recompute_feed_matches_other_case(self):
+        entries = backend.recompute_feed("u1")
+        self.assertEqual([entry["job_id"] for entry in entries], [str(self.job["_id"])])
+        self.assertEqual(entries[0]["score"], 1.0)
+
+    def test_fan_out_matches_other_case(self):
+        backend.fan_out_job(self.job)
+        operations = self.db.job_feeds.bulk_write.call_args[0][0]
+        self.assertEqual([operation._filter for operation in operations], [{"_id": "u1"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
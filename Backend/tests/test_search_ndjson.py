@@ -0,0 +1,77 @@
+"""Paginated job search streamed as NDJSON (search_jobs_response).
+
+Runs without MongoDB: `db.jobs` is replaced by a small in-memory collection.
+
+    python -m pytest Backend/tests
+"""
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+from bson import ObjectId
+
+# Importing app must not try to reach MongoDB.
+os.environ.setdefault("AUTO_CREATE_INDEXES", "0")
+os.environ.setdefault("JOB_SEARCH_INDEX", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as backend  # noqa: E402
+
+
+class FakeJobs:
+
+    def __init__(self, docs):
+        self.docs = {doc["_id"]: doc for doc in docs}
+
+    def find(self, query, projection=None):
+        return [dict(self.docs[object_id]) for object_id in query["_id"]["$in"] if object_id in self.docs]
+
+
+class SearchNDJSONTest(unittest.TestCase):
+
+    def setUp(self):
+        docs = [
+            {"_id": ObjectId(), "title": f"Python developer {n}", "skills": ["python"], "description": "", "category": "it"}
+            for n in range(5)
+        ]
+        index = backend.JobSearchIndex()
+        index.rebuild(docs)
+        self.db = mock.MagicMock()
+        self.db.jobs = FakeJobs(docs)
+        self.ids = {str(doc["_id"]) for doc in docs}
+        for patch in (mock.patch.object(backend, "db", self.db), mock.patch.object(backend, "job_search", index)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def fetch(self, query_string):
+        with backend.app.test_request_context("/api/jobs?" + query_string):
+            response = backend.search_jobs_response("python", None, None)
+            self.assertEqual(response.mimetype, backend.NDJSON_MIMETYPE)
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        return lines[:-1], lines[-1]
+
+    def test_pages_end_with_next_cursor(self):
+        seen = []
+        docs, trailer = self.fetch("stream=1&limit=2")
+        pages = 1
+        while trailer["next_cursor"]:
+            self.assertEqual(len(docs), 2)
+            seen.extend(doc["_id"] for doc in docs)
+            docs, trailer = self.fetch(f"stream=1&limit=2&cursor={trailer['next_cursor']}")
+            pages += 1
+        seen.extend(doc["_id"] for doc in docs)
+        self.assertEqual(pages, 3)
+        self.assertEqual(trailer, {"next_cursor": None})
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(set(seen), self.ids)
+
+    def test_unpaged_stream_has_null_cursor(self):
+        docs, trailer = self.fetch("stream=1")
+        self.assertEqual(len(docs), 5)
+        self.assertEqual(trailer, {"next_cursor": None})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+"""Failure paths of the write-behind XP buffer (XPBuffer / write_xp_batch).
+
+Runs without MongoDB: `db.users` is replaced by a small in-memory collection.
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+# Importing app must not try to reach MongoDB.
+os.environ.setdefault("AUTO_CREATE_INDEXES", "0")
+os.environ.setdefault("JOB_SEARCH_INDEX", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as backend  # noqa: E402
+
+mirror_xp_levels = backend.mirror_xp_levels
+
+
+class FakeUsers:
+    """Just enough of a users collection for write_xp_batch on a standalone server."""
+
+    def __init__(self, docs):
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.reject = set()
+        self.drop_reply = False
+        self.batches_sent = []
+
+    def find_one(self, query, projection=None):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    def find(self, query, projection=None):
+        return [dict(self.docs[object_id]) for object_id in query["_id"]["$in"] if object_id in self.docs]
+
+    def bulk_write(self, operations, ordered=True):
+        errors = []
+        for index, operation in enumerate(operations):
+            query, update = operation._filter, operation._doc
+            doc = self.docs.get(query["_id"])
+            if "$inc" not in update:
+                doc.update(update.get("$set", {}))
+                continue
+            batch_id = query["xp_batches"]["$ne"]
+            self.batches_sent.append(batch_id)
+            if query["_id"] in self.reject:
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+                continue
+            if doc is None or batch_id in doc.get("xp_batches", []):
+                continue
+            doc["xp"] = doc.get("xp", 0) + update["$inc"]["xp"]
+            doc.setdefault("xp_batches", []).extend(update["$push"]["xp_batches"]["$each"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "writeConcernErrors": [], "nInserted": 0})
+        if self.drop_reply:
+            # Applied on the server, but the client never hears back.
+            self.drop_reply = False
+            raise AutoReconnect("connection closed")
+
+
+class XPBufferFailureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.alice, self.bob = ObjectId(), ObjectId()
+        self.users = FakeUsers([{"_id": self.alice, "xp": 500}, {"_id": self.bob, "xp": 0}])
+        self.db = mock.MagicMock()
+        self.db.users = self.users
+        patches = [
+            mock.patch.object(backend, "db", self.db),
+            mock.patch.object(backend, "_cluster_time_available", False),
+            mock.patch.object(backend, "log_xp_events"),
+            mock.patch.object(backend, "mirror_xp_levels"),
+            mock.patch.object(backend.leaderboard, "record_xp"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.buffer = backend.XPBuffer(interval=60, flush_size=1000, max_users=1000)
+
+    def add(self, object_id, delta):
+        return self.buffer.add(str(object_id), object_id, delta)
+
+    def test_projection_survives_failed_flush(self):
+        self.assertEqual(self.add(self.alice, 5)["xp"], 505)
+        with mock.patch.object(backend, "write_xp_batch", side_effect=AutoReconnect("down")):
+            self.assertEqual(self.buffer.flush(), 0)
+        result = self.add(self.alice, 1)
+        self.assertEqual(result["xp"], 506)
+        backend.leaderboard.record_xp.assert_called_with(str(self.alice), 506, 1)
+
+    def test_projection_after_successful_flush(self):
+        self.add(self.alice, 5)
+        self.buffer.flush()
+        self.assertEqual(self.users.docs[self.alice]["xp"], 505)
+        self.assertEqual(self.add(self.alice, 1)["xp"], 506)
+
+    def test_lost_reply_is_not_applied_twice(self):
+        self.add(self.alice, 5)
+        self.add(self.bob, 3)
+        self.users.drop_reply = True
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.users.docs[self.alice]["xp"], 505)
+        self.add(self.alice, 2)
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(self.users.docs[self.alice]["xp"], 507)
+        self.assertEqual(self.users.docs[self.bob]["xp"], 3)
+        self.assertEqual(self.buffer.stats()["pending_xp"], 0)
+
+    def test_only_rejected_statements_are_retried(self):
+        self.add(self.alice, 5)
+        self.add(self.bob, 3)
+        self.users.reject = {self.bob}
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.users.docs[self.alice]["xp"], 505)
+        self.assertEqual(self.add(self.bob, 1)["xp"], 4)
+
+        self.users.reject = set()
+        self.users.batches_sent.clear()
+        self.assertEqual(self.buffer.flush(), 2)
+        # The retry only carries bob's rejected delta; his new grant follows in a new batch.
+        first, second = self.users.batches_sent
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.users.docs[self.alice]["xp"], 505)
+        self.assertEqual(self.users.docs[self.bob]["xp"], 4)
+
+    def test_write_concern_error_is_treated_as_unknown_outcome(self):
+        error = BulkWriteError({"writeErrors": [], "writeConcernErrors": [{"code": 64}]})
+        with mock.patch.object(self.users, "bulk_write", side_effect=error):
+            with self.assertRaises(BulkWriteError):
+                backend.write_xp_batch(ObjectId(), {str(self.alice): 5})
+
+    def test_mirror_failure_does_not_replay_xp(self):
+        self.add(self.alice, 5)
+        with mock.patch.object(backend, "mirror_xp_levels", mirror_xp_levels), \
+                mock.patch.object(backend, "apply_mirror_updates", side_effect=AutoReconnect("down")), \
+                mock.patch.object(backend.outbox_worker, "wake"):
+            self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.users.docs[self.alice]["xp"], 505)
+        self.assertEqual(self.buffer.stats()["pending_xp"], 0)
+        events = self.db.outbox.insert_many.call_args[0][0]
+        self.assertEqual([(event["user_id"], event["parts"]) for event in events], [(str(self.alice), ["level"])])
+
+
+if __name__ == "__main__":
+    unittest.main()